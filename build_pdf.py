@@ -10,6 +10,7 @@ build_pdf.py — Сборка переведённых Markdown-файлов в
 
 Требования:
     pip install xhtml2pdf markdown Pygments rich
+    pip install weasyprint      # опционально, быстрый движок PDF (--engine weasyprint)
 
 Использование:
     python build_pdf.py                        # собрать PDF из docs_ru/
@@ -17,13 +18,19 @@ build_pdf.py — Сборка переведённых Markdown-файлов в
     python build_pdf.py --source docs_en       # собрать из другой папки
     python build_pdf.py --no-images            # без иллюстраций
     python build_pdf.py --translated-images translated_images/  # папка с переведёнными картинками
+    python build_pdf.py --engine pisa          # принудительно xhtml2pdf
 """
 
 import argparse
 import json
+import multiprocessing
 import os
 import re
 import sys
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 
@@ -43,6 +50,22 @@ except ImportError:
 
 console = Console() if HAS_RICH else None
 
+# ---------------------------------------------------------------------------
+# orjson (опционально) — быстрый разбор больших JSON
+# ---------------------------------------------------------------------------
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def load_json_file(path: Path):
+    """Прочитать JSON-файл через orjson (если установлен) или stdlib json."""
+    if HAS_ORJSON:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))
+
 # ---------------------------------------------------------------------------
 # Пути
 # ---------------------------------------------------------------------------
@@ -54,6 +77,20 @@ IMAGES_RU_TEXT = ROOT / "images_ru_text"
 TRANSLATIONS_JSON = ROOT / "image_translations.json"
 GLOSSARY_PATH = ROOT / "glossary.json"
 
+# ---------------------------------------------------------------------------
+# Регулярные выражения (компилируются один раз)
+# ---------------------------------------------------------------------------
+_RICH_MARKUP_RE = re.compile(r'\[/?[^\]]*\]')
+_CAPTION_SECTION_RE = re.compile(
+    r'##\s*(Перевод для alt-текста|Краткое описание)\s*\n+(.+?)(?=\n##|\Z)',
+    re.DOTALL
+)
+_NAME_RE = re.compile(r'#\s+(\S+)')
+_HEADING_RE = re.compile(r'^(#{1,3})\s+(.+)$', re.MULTILINE)
+_IMG_RE = re.compile(r'<img\b(?P<attrs>[^>]*?)/?>')
+_SRC_ATTR_RE = re.compile(r'\bsrc="([^"]+)"')
+_ALT_ATTR_RE = re.compile(r'\balt="([^"]*)"')
+
 # ---------------------------------------------------------------------------
 # Утилиты
 # ---------------------------------------------------------------------------
@@ -62,7 +99,7 @@ def ui_print(msg: str, **kw):
     if HAS_RICH:
         console.print(msg, **kw)
     else:
-        clean = re.sub(r'\[/?[^\]]*\]', '', str(msg))
+        clean = _RICH_MARKUP_RE.sub('', str(msg))
         print(clean)
 
 
@@ -80,43 +117,47 @@ def log(msg: str, level: str = "INFO"):
 # Загрузка переведённых подписей к изображениям
 # ---------------------------------------------------------------------------
 
-def load_image_captions() -> dict[str, dict]:
-    """Загрузить переведённые alt-тексты и описания из images_ru_text/.
+@dataclass(slots=True)
+class Captions:
+    """Переведённые подписи к изображениям: имя файла -> текст.
 
-    Возвращает {image_filename: {"alt_ru": "...", "description": "..."}}
+    Два плоских словаря вместо словаря словарей — один поиск на картинку.
     """
-    captions = {}
+    alt_ru: dict[str, str] = field(default_factory=dict)
+    desc: dict[str, str] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.alt_ru)
+
+    def __contains__(self, img_name: str) -> bool:
+        return img_name in self.alt_ru
+
+    def add(self, img_name: str, alt_ru: str, desc: str):
+        self.alt_ru[img_name] = alt_ru
+        self.desc[img_name] = desc
+
+
+def _parse_caption_sections(md_text: str) -> tuple[str, str]:
+    """Извлечь "Перевод для alt-текста" и "Краткое описание" за один проход."""
+    sections = {}
+    for name, body in _CAPTION_SECTION_RE.findall(md_text):
+        sections.setdefault(name, body.strip())
+    return sections.get("Перевод для alt-текста", ""), sections.get("Краткое описание", "")
+
+
+def load_image_captions() -> Captions:
+    """Загрузить переведённые alt-тексты и описания из images_ru_text/."""
+    captions = Captions()
 
     # Из JSON (если есть)
     if TRANSLATIONS_JSON.exists():
         try:
-            data = json.loads(TRANSLATIONS_JSON.read_text(encoding="utf-8"))
+            data = load_json_file(TRANSLATIONS_JSON)
             for entry in data:
                 if isinstance(entry, dict) and entry.get("filename"):
                     md_text = entry.get("translation_md", "")
-                    alt_ru = ""
-                    desc = ""
-
-                    # Извлечь "Перевод для alt-текста"
-                    alt_match = re.search(
-                        r'##\s*Перевод для alt-текста\s*\n+(.+?)(?:\n##|\Z)',
-                        md_text, re.DOTALL
-                    )
-                    if alt_match:
-                        alt_ru = alt_match.group(1).strip()
-
-                    # Извлечь "Краткое описание"
-                    desc_match = re.search(
-                        r'##\s*Краткое описание\s*\n+(.+?)(?:\n##|\Z)',
-                        md_text, re.DOTALL
-                    )
-                    if desc_match:
-                        desc = desc_match.group(1).strip()
-
-                    captions[entry["filename"]] = {
-                        "alt_ru": alt_ru,
-                        "description": desc,
-                    }
+                    alt_ru, desc = _parse_caption_sections(md_text)
+                    captions.add(entry["filename"], alt_ru, desc)
         except (json.JSONDecodeError, KeyError):
             pass
 
@@ -126,7 +167,7 @@ def load_image_captions() -> dict[str, dict]:
             text = md_file.read_text(encoding="utf-8")
 
             # Имя изображения из заголовка
-            name_match = re.match(r'#\s+(\S+)', text)
+            name_match = _NAME_RE.match(text)
             if not name_match:
                 continue
             img_name = name_match.group(1)
@@ -134,23 +175,8 @@ def load_image_captions() -> dict[str, dict]:
             if img_name in captions:
                 continue  # уже из JSON
 
-            alt_ru = ""
-            alt_match = re.search(
-                r'##\s*Перевод для alt-текста\s*\n+(.+?)(?:\n##|\Z)',
-                text, re.DOTALL
-            )
-            if alt_match:
-                alt_ru = alt_match.group(1).strip()
-
-            desc = ""
-            desc_match = re.search(
-                r'##\s*Краткое описание\s*\n+(.+?)(?:\n##|\Z)',
-                text, re.DOTALL
-            )
-            if desc_match:
-                desc = desc_match.group(1).strip()
-
-            captions[img_name] = {"alt_ru": alt_ru, "description": desc}
+            alt_ru, desc = _parse_caption_sections(text)
+            captions.add(img_name, alt_ru, desc)
 
     return captions
 
@@ -159,32 +185,68 @@ def load_image_captions() -> dict[str, dict]:
 # Markdown → HTML
 # ---------------------------------------------------------------------------
 
+_MD = None
+
+
+def _get_md():
+    """Markdown-конвертер с расширениями — создаётся один раз на процесс."""
+    global _MD
+    if _MD is None:
+        import markdown
+        from markdown.extensions.codehilite import CodeHiliteExtension
+        from markdown.extensions.tables import TableExtension
+        from markdown.extensions.fenced_code import FencedCodeExtension
+        from markdown.extensions.toc import TocExtension
+
+        extensions = [
+            TableExtension(),
+            FencedCodeExtension(),
+            CodeHiliteExtension(css_class="codehilite", guess_lang=True),
+            TocExtension(permalink=False),
+            "markdown.extensions.attr_list",
+            "markdown.extensions.def_list",
+            "markdown.extensions.admonition",
+            "markdown.extensions.md_in_html",
+        ]
+        _MD = markdown.Markdown(extensions=extensions)
+    return _MD
+
+
 def markdown_to_html(md_text: str) -> str:
     """Конвертировать Markdown в HTML с расширениями."""
-    import markdown
-    from markdown.extensions.codehilite import CodeHiliteExtension
-    from markdown.extensions.tables import TableExtension
-    from markdown.extensions.fenced_code import FencedCodeExtension
-    from markdown.extensions.toc import TocExtension
-
-    extensions = [
-        TableExtension(),
-        FencedCodeExtension(),
-        CodeHiliteExtension(css_class="codehilite", guess_lang=True),
-        TocExtension(permalink=False),
-        "markdown.extensions.attr_list",
-        "markdown.extensions.def_list",
-        "markdown.extensions.admonition",
-        "markdown.extensions.md_in_html",
-    ]
-
-    html = markdown.markdown(md_text, extensions=extensions)
-    return html
+    return _get_md().reset().convert(md_text)
+
+
+def _dir_entries(directory: Path | None) -> set[str]:
+    """Имена файлов в папке одним листингом (вместо stat() на каждый кандидат)."""
+    if directory is None:
+        return set()
+    try:
+        return set(os.listdir(directory))
+    except OSError:
+        return set()
+
+
+@lru_cache(maxsize=4096)
+def _file_uri(path: str) -> str:
+    """file:// URI для абсолютного пути (без обращения к файловой системе)."""
+    return Path(path).as_uri()
+
+
+@lru_cache(maxsize=4096)
+def _build_figure(abs_uri: str, alt_ru: str) -> str:
+    """HTML <figure> для картинки; повторяющиеся картинки собираются один раз."""
+    parts = ['<figure class="book-figure">\n',
+             f'  <img src="{abs_uri}" alt="{alt_ru}" />\n']
+    if alt_ru:
+        parts.append(f'  <figcaption>{alt_ru}</figcaption>\n')
+    parts.append('</figure>')
+    return "".join(parts)
 
 
 def fix_image_paths(html: str, source_dir: Path,
                     translated_images_dir: Path | None,
-                    captions: dict[str, dict],
+                    captions: Captions,
                     include_images: bool = True) -> str:
     """Заменить пути к изображениям и добавить переведённые подписи.
 
@@ -193,16 +255,28 @@ def fix_image_paths(html: str, source_dir: Path,
     2. images/ (оригиналы)
     """
 
+    # Листинги папок — один раз на вызов, дальше только проверка по множеству
+    translated_names = _dir_entries(translated_images_dir)
+    images_names = _dir_entries(IMAGES_DIR)
+    # Пути строками: os.path.* без realpath/lstat на каждый компонент пути
+    translated_dir_str = os.path.abspath(translated_images_dir) if translated_images_dir else ""
+    images_dir_str = os.fspath(IMAGES_DIR)
+    source_dir_str = os.path.abspath(source_dir)
+    source_hits: dict[str, str | None] = {}
+
     def replace_img(match):
-        full_tag = match.group(0)
-        src = match.group(1)
-        alt = match.group(2) if match.group(2) else ""
+        attrs = match.group("attrs")
+        src_match = _SRC_ATTR_RE.search(attrs)
+        if not src_match:
+            return match.group(0)
+        src = src_match.group(1)
+        alt_match = _ALT_ATTR_RE.search(attrs)
+        alt = alt_match.group(1) if alt_match else ""
 
         if not include_images:
             # Заменить на подпись
             img_name = Path(src).name
-            caption_data = captions.get(img_name, {})
-            alt_ru = caption_data.get("alt_ru", alt)
+            alt_ru = captions.alt_ru.get(img_name, alt)
             if alt_ru:
                 return f'<p class="image-placeholder">[Иллюстрация: {alt_ru}]</p>'
             return ""
@@ -212,55 +286,32 @@ def fix_image_paths(html: str, source_dir: Path,
 
         # Приоритет: переведённые > оригиналы
         resolved_path = None
-        if translated_images_dir:
-            candidate = translated_images_dir / img_name
-            if candidate.exists():
-                resolved_path = candidate
+        if translated_dir_str and img_name in translated_names:
+            resolved_path = os.path.join(translated_dir_str, img_name)
 
         if not resolved_path:
             # Попробовать относительно source_dir
-            candidate = (source_dir / src).resolve()
-            if candidate.exists():
-                resolved_path = candidate
+            if src not in source_hits:
+                candidate = os.path.normpath(os.path.join(source_dir_str, src))
+                source_hits[src] = candidate if os.path.isfile(candidate) else None
+            resolved_path = source_hits[src]
 
-        if not resolved_path:
+        if not resolved_path and img_name in images_names:
             # Попробовать в images/
-            candidate = IMAGES_DIR / img_name
-            if candidate.exists():
-                resolved_path = candidate
+            resolved_path = os.path.join(images_dir_str, img_name)
 
         if not resolved_path:
             # Изображение не найдено — вставить placeholder
-            caption_data = captions.get(img_name, {})
-            alt_ru = caption_data.get("alt_ru", alt)
             return f'<p class="image-placeholder">[Изображение не найдено: {img_name}]</p>'
 
         # Переведённая подпись
-        caption_data = captions.get(img_name, {})
-        alt_ru = caption_data.get("alt_ru", alt)
+        alt_ru = captions.alt_ru.get(img_name, alt)
 
         # Абсолютный путь для weasyprint
-        abs_path = resolved_path.resolve().as_uri()
-
-        figure_html = f'<figure class="book-figure">\n'
-        figure_html += f'  <img src="{abs_path}" alt="{alt_ru}" />\n'
-        if alt_ru:
-            figure_html += f'  <figcaption>{alt_ru}</figcaption>\n'
-        figure_html += f'</figure>'
+        return _build_figure(_file_uri(resolved_path), alt_ru)
 
-        return figure_html
-
-    # Паттерн для img тегов
-    html = re.sub(
-        r'<img\s+[^>]*src="([^"]+)"[^>]*alt="([^"]*)"[^>]*/?>',
-        replace_img, html
-    )
-    # Также обработать src перед alt
-    html = re.sub(
-        r'<img\s+[^>]*alt="([^"]*)"[^>]*src="([^"]+)"[^>]*/?>',
-        lambda m: replace_img(type('M', (), {'group': lambda s, i: {0: m.group(0), 1: m.group(2), 2: m.group(1)}[i]})()),
-        html
-    )
+    # Один проход: атрибуты src/alt в любом порядке
+    html = _IMG_RE.sub(replace_img, html)
 
     return html
 
@@ -602,8 +653,9 @@ em {
 # Pygments CSS для code highlighting (тёмная тема)
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=1)
 def get_pygments_css() -> str:
-    """Сгенерировать CSS для подсветки кода."""
+    """Сгенерировать CSS для подсветки кода (один раз на процесс)."""
     try:
         from pygments.formatters import HtmlFormatter
         formatter = HtmlFormatter(style="monokai")
@@ -612,26 +664,53 @@ def get_pygments_css() -> str:
         return ""
 
 
+@lru_cache(maxsize=4)
+def build_stylesheet(font_css: str = "") -> str:
+    """Содержимое <style>: книжная вёрстка + Pygments + @font-face."""
+    css = f"{BOOK_CSS}\n\n{get_pygments_css()}"
+    if font_css:
+        css += f"\n{font_css}\n"
+    return css
+
+
 # ---------------------------------------------------------------------------
 # Сборка HTML-документа
 # ---------------------------------------------------------------------------
 
+def _batch_read_texts(paths: list[Path]) -> list[str]:
+    """Прочитать несколько файлов параллельно, сохранив порядок.
+
+    Чтения идут из пула потоков (GIL отпускается на read), так что на
+    холодном кэше запросы к диску не ждут друг друга.
+    """
+    if len(paths) < 2:
+        return [p.read_text(encoding="utf-8") for p in paths]
+    with ThreadPoolExecutor(max_workers=min(len(paths), 32)) as ex:
+        return list(ex.map(lambda p: p.read_text(encoding="utf-8"), paths))
+
+
 def extract_headings(md_text: str) -> list[tuple[int, str]]:
     """Извлечь заголовки из Markdown для содержания."""
     headings = []
-    for match in re.finditer(r'^(#{1,3})\s+(.+)$', md_text, re.MULTILINE):
+    if "#" not in md_text:
+        return headings
+    for match in _HEADING_RE.finditer(md_text):
         level = len(match.group(1))
         title = match.group(2).strip()
         headings.append((level, title))
     return headings
 
 
+# Символы inline-разметки, вырезаемые из заголовков в содержании
+_INLINE_MARKUP_TABLE = str.maketrans("", "", "*_`")
+
+
 def build_toc_html(all_headings: list[tuple[int, str]]) -> str:
     """Построить HTML-содержание."""
     lines = ['<div class="toc">', '<h1>Содержание</h1>', '<ul>']
     for level, title in all_headings:
         css_class = f"toc-h{level}"
-        clean_title = re.sub(r'[*_`]', '', title)
+        clean_title = title.translate(_INLINE_MARKUP_TABLE)
         lines.append(f'  <li class="{css_class}">{clean_title}</li>')
     lines.append('</ul>')
     lines.append('</div>')
@@ -658,28 +737,86 @@ def build_title_page(title: str = "", subtitle: str = "") -> str:
 """
 
 
-def assemble_html(md_files: list[Path], source_dir: Path,
-                  translated_images_dir: Path | None,
-                  captions: dict[str, dict],
-                  include_images: bool = True,
-                  title: str = "",
-                  subtitle: str = "") -> str:
-    """Собрать единый HTML-документ из списка Markdown-файлов."""
+# Меньше файлов — конвертировать в текущем процессе (запуск пула дороже)
+PARALLEL_MIN_FILES = 4
+
+# Общие параметры конвертации в процессе-воркере (задаются initializer'ом)
+_WORKER_STATE: dict = {}
+
+
+def _convert_one(md_text: str, source_dir: Path,
+                 translated_images_dir: Path | None,
+                 captions: Captions,
+                 include_images: bool) -> tuple[list[tuple[int, str]], str]:
+    """Markdown одного файла -> (заголовки, HTML с исправленными картинками)."""
+    headings = extract_headings(md_text)
+    html_part = markdown_to_html(md_text)
+    html_part = fix_image_paths(
+        html_part, source_dir, translated_images_dir,
+        captions, include_images
+    )
+    return headings, html_part
+
+
+def _init_worker(source_dir: Path, translated_images_dir: Path | None,
+                 captions: Captions, include_images: bool):
+    _WORKER_STATE.update(
+        source_dir=source_dir,
+        translated_images_dir=translated_images_dir,
+        captions=captions,
+        include_images=include_images,
+    )
+
+
+def _convert_in_worker(md_text: str) -> tuple[list[tuple[int, str]], str]:
+    return _convert_one(md_text, **_WORKER_STATE)
+
+
+def iter_html(md_files: list[Path], source_dir: Path,
+              translated_images_dir: Path | None,
+              captions: Captions,
+              include_images: bool = True,
+              title: str = "",
+              subtitle: str = "",
+              font_css: str = "") -> Iterator[str]:
+    """Собрать HTML-документ по частям — для потоковой записи на диск.
+
+    Содержание строится по заголовкам всех файлов, поэтому конвертация
+    выполняется до первой выдачи; итоговая строка целиком не создаётся.
+    """
 
     all_headings = []
     body_parts = []
 
-    for md_path in md_files:
-        md_text = md_path.read_text(encoding="utf-8")
-        headings = extract_headings(md_text)
-        all_headings.extend(headings)
+    md_texts = _batch_read_texts(md_files)
 
-        html_part = markdown_to_html(md_text)
-        html_part = fix_image_paths(
-            html_part, source_dir, translated_images_dir,
-            captions, include_images
-        )
+    if len(md_texts) < PARALLEL_MIN_FILES:
+        results = [
+            _convert_one(md_text, source_dir, translated_images_dir,
+                         captions, include_images)
+            for md_text in md_texts
+        ]
+    else:
+        worker_args = (source_dir, translated_images_dir, captions, include_images)
+        if sys.platform == "linux":
+            # fork: воркеры наследуют _WORKER_STATE copy-on-write, без pickle
+            _init_worker(*worker_args)
+            pool_kwargs = {"mp_context": multiprocessing.get_context("fork")}
+        else:
+            pool_kwargs = {"initializer": _init_worker, "initargs": worker_args}
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(len(md_texts), os.cpu_count() or 1),
+                **pool_kwargs,
+            ) as ex:
+                results = list(ex.map(_convert_in_worker, md_texts))
+        finally:
+            _WORKER_STATE.clear()
+
+    for headings, html_part in results:
+        all_headings.extend(headings)
         body_parts.append(html_part)
+    del md_texts, results
 
     # Титульная страница
     title_html = build_title_page(title, subtitle)
@@ -687,36 +824,48 @@ def assemble_html(md_files: list[Path], source_dir: Path,
     # Содержание
     toc_html = build_toc_html(all_headings) if all_headings else ""
 
-    # Pygments CSS
-    pygments_css = get_pygments_css()
+    yield '<!DOCTYPE html>\n<html lang="ru">\n<head>\n'
+    yield '    <meta charset="UTF-8"/>\n    <style>\n'
+    yield build_stylesheet(font_css)
+    yield "\n    </style>\n</head>\n<body>\n"
+    yield title_html
+    yield "\n\n"
+    yield toc_html
+    yield "\n\n"
+    for i in range(len(body_parts)):
+        if i:
+            yield "<hr/>"
+        # Отдать часть и сразу отпустить ссылку: записанное не держится в памяти
+        html_part, body_parts[i] = body_parts[i], None
+        yield html_part
+    yield "\n</body>\n</html>"
 
-    # Итоговый HTML
-    full_html = f"""<!DOCTYPE html>
-<html lang="ru">
-<head>
-    <meta charset="UTF-8"/>
-    <style>
-{BOOK_CSS}
 
-{pygments_css}
-    </style>
-</head>
-<body>
-{title_html}
-
-{toc_html}
+def assemble_html(md_files: list[Path], source_dir: Path,
+                  translated_images_dir: Path | None,
+                  captions: Captions,
+                  include_images: bool = True,
+                  title: str = "",
+                  subtitle: str = "",
+                  font_css: str = "") -> str:
+    """Собрать единый HTML-документ из списка Markdown-файлов."""
+    return "".join(iter_html(
+        md_files, source_dir, translated_images_dir, captions,
+        include_images, title, subtitle, font_css
+    ))
 
-{'<hr/>'.join(body_parts)}
-</body>
-</html>"""
 
-    return full_html
+def write_html(html_path: Path, fragments: Iterable[str]):
+    """Записать HTML на диск по частям, без склейки в одну строку."""
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.writelines(fragments)
 
 
 # ---------------------------------------------------------------------------
 # Генерация PDF
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=1)
 def find_cyrillic_fonts() -> dict[str, dict[str, str]]:
     """Найти TTF-шрифты с кириллицей. Возвращает пути для @font-face."""
     import platform
@@ -725,47 +874,47 @@ def find_cyrillic_fonts() -> dict[str, dict[str, str]]:
     system = platform.system()
 
     if system == "Windows":
-        wf = os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts")
+        font_dir = os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts")
         candidates = {
-            "CyrSerif": {
-                "normal": os.path.join(wf, "times.ttf"),
-                "bold": os.path.join(wf, "timesbd.ttf"),
-                "italic": os.path.join(wf, "timesi.ttf"),
-            },
-            "CyrSans": {
-                "normal": os.path.join(wf, "arial.ttf"),
-                "bold": os.path.join(wf, "arialbd.ttf"),
-                "italic": os.path.join(wf, "ariali.ttf"),
-            },
-            "CyrMono": {
-                "normal": os.path.join(wf, "cour.ttf"),
-                "bold": os.path.join(wf, "courbd.ttf"),
-                "italic": os.path.join(wf, "couri.ttf"),
-            },
+            "CyrSerif": {"normal": "times.ttf", "bold": "timesbd.ttf", "italic": "timesi.ttf"},
+            "CyrSans": {"normal": "arial.ttf", "bold": "arialbd.ttf", "italic": "ariali.ttf"},
+            "CyrMono": {"normal": "cour.ttf", "bold": "courbd.ttf", "italic": "couri.ttf"},
         }
     else:
-        dv = "/usr/share/fonts/truetype/dejavu"
+        font_dir = "/usr/share/fonts/truetype/dejavu"
         candidates = {
             "CyrSerif": {
-                "normal": f"{dv}/DejaVuSerif.ttf",
-                "bold": f"{dv}/DejaVuSerif-Bold.ttf",
-                "italic": f"{dv}/DejaVuSerif-Italic.ttf",
+                "normal": "DejaVuSerif.ttf",
+                "bold": "DejaVuSerif-Bold.ttf",
+                "italic": "DejaVuSerif-Italic.ttf",
             },
             "CyrSans": {
-                "normal": f"{dv}/DejaVuSans.ttf",
-                "bold": f"{dv}/DejaVuSans-Bold.ttf",
-                "italic": f"{dv}/DejaVuSans-Oblique.ttf",
+                "normal": "DejaVuSans.ttf",
+                "bold": "DejaVuSans-Bold.ttf",
+                "italic": "DejaVuSans-Oblique.ttf",
             },
             "CyrMono": {
-                "normal": f"{dv}/DejaVuSansMono.ttf",
-                "bold": f"{dv}/DejaVuSansMono-Bold.ttf",
-                "italic": f"{dv}/DejaVuSansMono-Oblique.ttf",
+                "normal": "DejaVuSansMono.ttf",
+                "bold": "DejaVuSansMono-Bold.ttf",
+                "italic": "DejaVuSansMono-Oblique.ttf",
             },
         }
 
+    # Один листинг папки вместо stat() на каждый вариант шрифта.
+    # На Windows имена файлов регистронезависимы.
+    fold = str.lower if system == "Windows" else str
+    try:
+        with os.scandir(font_dir) as it:
+            present = {fold(e.name) for e in it}
+    except OSError:
+        present = set()
+
     for family, variants in candidates.items():
-        if os.path.exists(variants["normal"]):
-            result[family] = {k: v for k, v in variants.items() if os.path.exists(v)}
+        if fold(variants["normal"]) in present:
+            result[family] = {
+                k: os.path.join(font_dir, v)
+                for k, v in variants.items() if fold(v) in present
+            }
 
     return result
 
@@ -795,9 +944,12 @@ def build_font_face_css(fonts: dict[str, dict[str, str]]) -> str:
     return "\n\n".join(css_parts)
 
 
-def generate_pdf(html: str, output_path: Path):
-    """Сгенерировать PDF из HTML через xhtml2pdf."""
-    from xhtml2pdf import pisa
+def register_cyrillic_fonts() -> str:
+    """Зарегистрировать кириллические шрифты в reportlab.
+
+    Возвращает @font-face CSS для вставки в HTML (пустая строка, если
+    шрифты не найдены).
+    """
     from reportlab.pdfbase import pdfmetrics
     from reportlab.pdfbase.ttfonts import TTFont
     from reportlab.lib.fonts import addMapping
@@ -805,37 +957,45 @@ def generate_pdf(html: str, output_path: Path):
     log("Поиск шрифтов с кириллицей...")
     fonts = find_cyrillic_fonts()
 
-    if fonts:
-        log(f"  Найдены: {', '.join(fonts.keys())}", "OK")
-
-        # 1) Зарегистрировать в reportlab
-        for family, variants in fonts.items():
-            try:
-                pdfmetrics.registerFont(TTFont(family, variants["normal"]))
-                addMapping(family, 0, 0, family)
-
-                if "bold" in variants:
-                    bold_name = f"{family}-Bold"
-                    pdfmetrics.registerFont(TTFont(bold_name, variants["bold"]))
-                    addMapping(family, 1, 0, bold_name)
-
-                if "italic" in variants:
-                    italic_name = f"{family}-Italic"
-                    pdfmetrics.registerFont(TTFont(italic_name, variants["italic"]))
-                    addMapping(family, 0, 1, italic_name)
-            except Exception as e:
-                log(f"  Ошибка регистрации {family}: {e}", "WARN")
-
-        # 2) Вставить @font-face в HTML
-        font_css = build_font_face_css(fonts)
-        html = html.replace("</style>", f"\n{font_css}\n</style>")
-    else:
+    if not fonts:
         log("  Кириллические шрифты не найдены — возможны □□□", "WARN")
+        return ""
+
+    log(f"  Найдены: {', '.join(fonts.keys())}", "OK")
+
+    for family, variants in fonts.items():
+        try:
+            pdfmetrics.registerFont(TTFont(family, variants["normal"]))
+            addMapping(family, 0, 0, family)
+
+            if "bold" in variants:
+                bold_name = f"{family}-Bold"
+                pdfmetrics.registerFont(TTFont(bold_name, variants["bold"]))
+                addMapping(family, 1, 0, bold_name)
+
+            if "italic" in variants:
+                italic_name = f"{family}-Italic"
+                pdfmetrics.registerFont(TTFont(italic_name, variants["italic"]))
+                addMapping(family, 0, 1, italic_name)
+        except Exception as e:
+            log(f"  Ошибка регистрации {family}: {e}", "WARN")
+
+    return build_font_face_css(fonts)
+
+
+def generate_pdf(html_path: Path, output_path: Path):
+    """Сгенерировать PDF из HTML-файла через xhtml2pdf.
+
+    HTML читается из файла, а не из строки в памяти. Шрифты должны быть
+    зарегистрированы заранее (register_cyrillic_fonts), а их @font-face —
+    уже записан в HTML.
+    """
+    from xhtml2pdf import pisa
 
     log(f"Генерация PDF: {output_path.name}...")
 
-    with open(output_path, "wb") as f:
-        status = pisa.CreatePDF(html, dest=f, encoding="utf-8")
+    with open(html_path, "rb") as src, open(output_path, "wb") as dst:
+        status = pisa.CreatePDF(src, dest=dst, encoding="utf-8")
 
     if status.err:
         log(f"xhtml2pdf: {status.err} ошибок при конвертации", "WARN")
@@ -844,6 +1004,32 @@ def generate_pdf(html: str, output_path: Path):
     log(f"PDF готов: {output_path} ({size_mb:.1f} MB)", "OK")
 
 
+def weasyprint_available() -> bool:
+    """Установлен ли WeasyPrint вместе с системными библиотеками (pango/cairo)."""
+    try:
+        import weasyprint  # noqa: F401
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def generate_pdf_weasy(html_path: Path, output_path: Path):
+    """Сгенерировать PDF из HTML-файла через WeasyPrint.
+
+    Вёрстка выполняется C-библиотеками (pango/cairo) — на больших книгах
+    с иллюстрациями заметно быстрее xhtml2pdf. Шрифты подключаются через
+    @font-face в HTML, регистрация в reportlab не нужна.
+    """
+    from weasyprint import HTML
+
+    log(f"Генерация PDF (WeasyPrint): {output_path.name}...")
+
+    HTML(filename=str(html_path), base_url=str(ROOT)).write_pdf(str(output_path))
+
+    size_mb = output_path.stat().st_size / (1024 * 1024)
+    log(f"PDF готов: {output_path} ({size_mb:.1f} MB)", "OK")
+
+
 # ---------------------------------------------------------------------------
 # Интерактивное меню
 # ---------------------------------------------------------------------------
@@ -941,6 +1127,8 @@ def main():
   python build_pdf.py --translated-images tr_images/     # переведённые картинки
   python build_pdf.py --no-images                        # без картинок
   python build_pdf.py --title "Моя книга" --no-interactive
+  python build_pdf.py --engine pisa                      # xhtml2pdf вместо WeasyPrint
+  python build_pdf.py --keep-html                        # оставить HTML рядом с PDF
         """
     )
     parser.add_argument("--source", default="docs_ru", help="Папка с Markdown-файлами (по умолчанию: docs_ru)")
@@ -951,6 +1139,9 @@ def main():
     parser.add_argument("--subtitle", default="", help="Подзаголовок")
     parser.add_argument("--no-interactive", action="store_true", help="Без интерактивного режима")
     parser.add_argument("--html-only", action="store_true", help="Только HTML (без PDF)")
+    parser.add_argument("--keep-html", action="store_true", help="Сохранить промежуточный HTML рядом с PDF")
+    parser.add_argument("--engine", choices=["pisa", "weasyprint"], default=None,
+                        help="Движок PDF (по умолчанию: weasyprint, если установлен, иначе xhtml2pdf)")
     args = parser.parse_args()
 
     source_dir = ROOT / args.source
@@ -995,12 +1186,19 @@ def main():
         log("ОШИБКА: pip install markdown", "ERROR")
         sys.exit(1)
 
+    engine = args.engine or ("weasyprint" if weasyprint_available() else "pisa")
+
     if not args.html_only:
-        try:
-            import xhtml2pdf
-        except ImportError:
-            log("ОШИБКА: pip install xhtml2pdf", "ERROR")
-            sys.exit(1)
+        if engine == "weasyprint":
+            if not weasyprint_available():
+                log("ОШИБКА: pip install weasyprint", "ERROR")
+                sys.exit(1)
+        else:
+            try:
+                import xhtml2pdf
+            except ImportError:
+                log("ОШИБКА: pip install xhtml2pdf", "ERROR")
+                sys.exit(1)
 
     # Загрузка переведённых подписей
     log("Загрузка конфигурации...")
@@ -1015,8 +1213,23 @@ def main():
     for f in md_files:
         log(f"    • {f.name}")
 
-    # Сборка HTML
+    # Шрифты нужны до записи HTML: их @font-face идёт в <style>
+    font_css = ""
+    if not args.html_only:
+        try:
+            if engine == "weasyprint":
+                font_css = build_font_face_css(find_cyrillic_fonts())
+            else:
+                font_css = register_cyrillic_fonts()
+        except Exception as e:
+            log(f"Ошибка регистрации шрифтов: {e}", "WARN")
+
+    # Сборка HTML — сразу на диск (вход для PDF). Рядом с PDF остаётся
+    # только при --keep-html / --html-only, иначе это временный файл.
     log("Сборка HTML...")
+    keep_html = args.keep_html or args.html_only
+    html_path = output_path.with_suffix(".html")
+    build_html_path = html_path if keep_html else output_path.with_suffix(".tmp.html")
 
     if HAS_RICH:
         with Progress(
@@ -1026,21 +1239,19 @@ def main():
             console=console,
         ) as progress:
             task = progress.add_task("Конвертация Markdown → HTML", total=1)
-            full_html = assemble_html(
+            write_html(build_html_path, iter_html(
                 md_files, source_dir, translated_images_dir,
-                captions, include_images, title, subtitle
-            )
+                captions, include_images, title, subtitle, font_css
+            ))
             progress.update(task, advance=1)
     else:
-        full_html = assemble_html(
+        write_html(build_html_path, iter_html(
             md_files, source_dir, translated_images_dir,
-            captions, include_images, title, subtitle
-        )
+            captions, include_images, title, subtitle, font_css
+        ))
 
-    # Сохранить HTML (для отладки или --html-only)
-    html_path = output_path.with_suffix(".html")
-    html_path.write_text(full_html, encoding="utf-8")
-    log(f"HTML сохранён: {html_path}", "OK")
+    if keep_html:
+        log(f"HTML сохранён: {html_path}", "OK")
 
     if args.html_only:
         log("Режим --html-only, PDF не генерируется.")
@@ -1048,12 +1259,20 @@ def main():
 
     # Генерация PDF
     try:
-        generate_pdf(full_html, output_path)
+        if engine == "weasyprint":
+            generate_pdf_weasy(build_html_path, output_path)
+        else:
+            generate_pdf(build_html_path, output_path)
     except Exception as e:
         log(f"Ошибка генерации PDF: {e}", "ERROR")
-        log("HTML сохранён — можно открыть в браузере и распечатать в PDF.")
+        if build_html_path != html_path:
+            build_html_path.replace(html_path)
+        log(f"HTML сохранён: {html_path} — можно открыть в браузере и распечатать в PDF.")
         sys.exit(1)
 
+    if build_html_path != html_path:
+        build_html_path.unlink(missing_ok=True)
+
     # Итог
     if HAS_RICH:
         console.print()
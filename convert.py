@@ -11,6 +11,7 @@ convert.py - Конвертер переведенных Markdown-файлов 
 
 Требования:
     pip install fpdf2 markdown pymdown-extensions
+    pip install cmarkgfm        # опционально, быстрый Markdown -> HTML
 
 Использование:
     # Конвертировать все переведенные файлы
@@ -30,8 +31,17 @@ convert.py - Конвертер переведенных Markdown-файлов 
 """
 
 import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
+import queue
 import re
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 
@@ -50,12 +60,51 @@ except ImportError:
 
 console = Console() if HAS_RICH else None
 
+# ---------------------------------------------------------------------------
+# cmarkgfm (опционально) - C-реализация GitHub Flavored Markdown
+# ---------------------------------------------------------------------------
+try:
+    import cmarkgfm
+    from cmarkgfm.cmark import Options as CmarkOptions
+    HAS_CMARK = True
+except ImportError:
+    HAS_CMARK = False
+
+# Сырой HTML пропускается как в python-markdown, переводы строк -> <br> (как nl2br)
+CMARK_OPTIONS = (
+    CmarkOptions.CMARK_OPT_UNSAFE | CmarkOptions.CMARK_OPT_HARDBREAKS
+    if HAS_CMARK else 0
+)
+CMARK_EXTENSIONS = ['table', 'strikethrough', 'autolink', 'tasklist']
+
+# ---------------------------------------------------------------------------
+# Регулярные выражения (компилируются один раз)
+# ---------------------------------------------------------------------------
+_RE_RICH_MARKUP = re.compile(r'\[/?[^\]]*\]')
+# Inline-разметка одним проходом: альтернативы в порядке приоритета
+_RE_INLINE = re.compile(
+    r'\*\*\*(?P<bi>.+?)\*\*\*'
+    r'|\*\*(?P<b>.+?)\*\*'
+    r'|\*(?P<i>.+?)\*'
+    r'|__(?P<u2>.+?)__'
+    r'|_(?P<u1>.+?)_'
+    r'|`(?P<c>.+?)`'
+    r'|!\[(?P<img>.+?)\]\(.+?\)'
+    r'|\[(?P<l>(?:!\[[^\]]*\]\([^)]*\)|[^\]])+?)\]\(.+?\)'
+    r'|~~(?P<s>.+?)~~'
+)
+# Символы, с которых начинается любая альтернатива _RE_INLINE
+_RE_INLINE_TRIGGER = re.compile(r'[*_`\[~]')
+_RE_TITLE = re.compile(r'^#\s+(.+)', re.MULTILINE)
+_RE_LIST = re.compile(r'^(\s*)([-*+]|\d+\.)\s+(.+)')
+_RE_TABLE_SEP = re.compile(r'^\|[\s\-:|]+\|$')
+
 
 def ui_print(msg: str):
     if HAS_RICH:
         console.print(msg)
     else:
-        clean = re.sub(r'\[/?[^\]]*\]', '', str(msg))
+        clean = _RE_RICH_MARKUP.sub('', str(msg))
         print(clean)
 
 
@@ -76,6 +125,16 @@ ROOT = Path(__file__).resolve().parent
 FONT_DIR = ROOT / "fonts"
 DEFAULT_INPUT = ROOT / "docs_ru"
 
+# Буфер записи выходных файлов: документ уходит на диск одним write()
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def write_bytes_buffered(path: Path, data: bytes | bytearray):
+    """Записать готовый документ одним вызовом через большой буфер."""
+    with open(path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(data)
+
+
 # ---------------------------------------------------------------------------
 # HTML-шаблон
 # ---------------------------------------------------------------------------
@@ -87,14 +146,14 @@ HTML_TEMPLATE = """<!DOCTYPE html>
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{title}</title>
     <style>
-        @font-face {{
+        @font-face {
             font-family: 'DejaVu Sans';
             src: url('data:font/ttf;base64,') format('truetype');
-        }}
-        * {{
+        }
+        * {
             box-sizing: border-box;
-        }}
-        body {{
+        }
+        body {
             font-family: 'DejaVu Sans', 'Segoe UI', 'Helvetica Neue', Arial, sans-serif;
             line-height: 1.7;
             color: #1a1a2e;
@@ -102,49 +161,49 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             max-width: 860px;
             margin: 0 auto;
             padding: 40px 32px;
-        }}
-        h1 {{
+        }
+        h1 {
             font-size: 2em;
             border-bottom: 3px solid #4361ee;
             padding-bottom: 12px;
             margin-top: 40px;
             color: #16213e;
-        }}
-        h2 {{
+        }
+        h2 {
             font-size: 1.5em;
             border-bottom: 1px solid #dee2e6;
             padding-bottom: 8px;
             margin-top: 36px;
             color: #1a1a2e;
-        }}
-        h3 {{
+        }
+        h3 {
             font-size: 1.25em;
             margin-top: 28px;
             color: #2d3436;
-        }}
-        h4, h5, h6 {{
+        }
+        h4, h5, h6 {
             margin-top: 24px;
             color: #2d3436;
-        }}
-        p {{
+        }
+        p {
             margin: 12px 0;
-        }}
-        a {{
+        }
+        a {
             color: #4361ee;
             text-decoration: none;
-        }}
-        a:hover {{
+        }
+        a:hover {
             text-decoration: underline;
-        }}
-        code {{
+        }
+        code {
             background: #e9ecef;
             padding: 2px 6px;
             border-radius: 4px;
             font-family: 'DejaVu Sans Mono', 'Consolas', 'Courier New', monospace;
             font-size: 0.9em;
             color: #d63384;
-        }}
-        pre {{
+        }
+        pre {
             background: #1e1e2e;
             color: #cdd6f4;
             padding: 20px;
@@ -152,75 +211,79 @@ HTML_TEMPLATE = """<!DOCTYPE html>
             overflow-x: auto;
             line-height: 1.5;
             margin: 16px 0;
-        }}
-        pre code {{
+        }
+        pre code {
             background: none;
             color: inherit;
             padding: 0;
             font-size: 0.88em;
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
             margin: 16px 0;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #dee2e6;
             padding: 10px 14px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background: #f1f3f5;
             font-weight: 600;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background: #f8f9fa;
-        }}
-        blockquote {{
+        }
+        blockquote {
             border-left: 4px solid #4361ee;
             margin: 16px 0;
             padding: 12px 20px;
             background: #eef2ff;
             color: #3b3b5c;
-        }}
-        blockquote p {{
+        }
+        blockquote p {
             margin: 4px 0;
-        }}
-        img {{
+        }
+        img {
             max-width: 100%;
             height: auto;
             border-radius: 8px;
             margin: 16px 0;
-        }}
-        ul, ol {{
+        }
+        ul, ol {
             padding-left: 28px;
-        }}
-        li {{
+        }
+        li {
             margin: 4px 0;
-        }}
-        hr {{
+        }
+        hr {
             border: none;
             border-top: 2px solid #dee2e6;
             margin: 32px 0;
-        }}
-        .meta {{
+        }
+        .meta {
             color: #868e96;
             font-size: 0.85em;
             border-top: 1px solid #dee2e6;
             padding-top: 16px;
             margin-top: 48px;
-        }}
-        @media print {{
-            body {{
+        }
+        @media print {
+            body {
                 max-width: none;
                 padding: 20px;
-            }}
-            pre {{
+            }
+            pre {
                 white-space: pre-wrap;
                 word-wrap: break-word;
-            }}
-        }}
+            }
+        }
     </style>
+    <!-- Подсветка кода в браузере: fenced_code/cmarkgfm дают <code class="language-X"> -->
+    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/prismjs@1/themes/prism-tomorrow.min.css">
+    <script defer src="https://cdn.jsdelivr.net/npm/prismjs@1/prism.min.js"></script>
+    <script defer src="https://cdn.jsdelivr.net/npm/prismjs@1/plugins/autoloader/prism-autoloader.min.js"></script>
 </head>
 <body>
 {content}
@@ -231,49 +294,82 @@ HTML_TEMPLATE = """<!DOCTYPE html>
 </html>
 """
 
+
+
+def _split_html_template(template: str) -> tuple[str, str, str, str]:
+    """Разрезать шаблон по {title}/{content}/{date}.
+
+    Делается один раз при импорте - md_to_html только склеивает части.
+    Шаблон не проходит через str.format, поэтому фигурные скобки CSS в нем
+    не экранируются.
+    """
+    head, rest = template.split("{title}", 1)
+    mid1, rest = rest.split("{content}", 1)
+    mid2, tail = rest.split("{date}", 1)
+    return head, mid1, mid2, tail
+
+
+_HTML_HEAD, _HTML_MID1, _HTML_MID2, _HTML_TAIL = _split_html_template(HTML_TEMPLATE)
+
 # ---------------------------------------------------------------------------
 # Markdown -> HTML
 # ---------------------------------------------------------------------------
 
-def md_to_html(md_text: str, title: str = "") -> str:
-    """Конвертировать Markdown в HTML с красивым оформлением."""
-    import markdown
-    extensions = [
-        'markdown.extensions.tables',
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.toc',
-        'markdown.extensions.nl2br',
-        'markdown.extensions.sane_lists',
-    ]
-    extension_configs = {
-        'markdown.extensions.codehilite': {
-            'css_class': 'highlight',
-            'guess_lang': False,
-        },
-        'markdown.extensions.toc': {
-            'permalink': False,
-        },
-    }
-
-    html_content = markdown.markdown(
-        md_text,
-        extensions=extensions,
-        extension_configs=extension_configs,
-    )
+_MD = None
 
-    if not title:
-        # Извлечь заголовок из первого # в markdown
-        match = re.search(r'^#\s+(.+)', md_text, re.MULTILINE)
-        title = match.group(1).strip() if match else "Документ"
+
+def _get_md():
+    """Markdown-конвертер с расширениями — создаётся один раз на процесс."""
+    global _MD
+    if _MD is None:
+        import markdown
+        extensions = [
+            'markdown.extensions.tables',
+            'markdown.extensions.fenced_code',
+            'markdown.extensions.toc',
+            'markdown.extensions.nl2br',
+            'markdown.extensions.sane_lists',
+        ]
+        extension_configs = {
+            'markdown.extensions.toc': {
+                'permalink': False,
+            },
+        }
+        _MD = markdown.Markdown(
+            extensions=extensions,
+            extension_configs=extension_configs,
+        )
+    return _MD
+
+
+def extract_title(md_text: str, default: str = "Документ") -> str:
+    """Заголовок документа - текст первого '# ...' в markdown."""
+    match = _RE_TITLE.search(md_text)
+    return match.group(1).strip() if match else default
+
+
+def md_to_html(md_text: str, title: str) -> str:
+    """Конвертировать Markdown в HTML с красивым оформлением.
+
+    title считает вызывающий (extract_title) - один раз на файл.
+    Если установлен cmarkgfm - через него (в разы быстрее), иначе через
+    python-markdown. Оба дают <pre><code class="language-X"> для Prism.
+    """
+    if HAS_CMARK:
+        html_content = cmarkgfm.markdown_to_html_with_extensions(
+            md_text, options=CMARK_OPTIONS, extensions=CMARK_EXTENSIONS,
+        )
+    else:
+        html_content = _get_md().reset().convert(md_text)
 
     date_str = datetime.now().strftime("%Y-%m-%d %H:%M")
 
-    return HTML_TEMPLATE.format(
-        title=title,
-        content=html_content,
-        date=date_str,
-    )
+    return "".join((
+        _HTML_HEAD, title,
+        _HTML_MID1, html_content,
+        _HTML_MID2, date_str,
+        _HTML_TAIL,
+    ))
 
 
 # ---------------------------------------------------------------------------
@@ -289,12 +385,14 @@ class RuPDF:
         self.pdf = FPDF()
         self.pdf.set_auto_page_break(auto=True, margin=20)
         self.font_dir = font_dir
+        # Шрифты регистрируются в generate() - только те, что нужны документу
 
-        # Регистрация шрифтов
-        self._register_fonts()
+    def _register_fonts(self, needed: set[tuple[str, str]] | None = None):
+        """Зарегистрировать шрифты из папки fonts/.
 
-    def _register_fonts(self):
-        """Зарегистрировать шрифты из папки fonts/."""
+        needed - набор (family, style); None = все шрифты. Разбор TTF
+        дорогой, поэтому неиспользуемые начертания не загружаются.
+        """
         font_map = {
             "DejaVuSans": {
                 "": "DejaVuSans.ttf",
@@ -310,6 +408,8 @@ class RuPDF:
 
         for family, styles in font_map.items():
             for style, filename in styles.items():
+                if needed is not None and (family, style) not in needed:
+                    continue
                 font_path = self.font_dir / filename
                 if font_path.exists():
                     self.pdf.add_font(family, style, str(font_path))
@@ -318,83 +418,45 @@ class RuPDF:
 
     def generate(self, md_text: str, output_path: Path, title: str = ""):
         """Сгенерировать PDF из Markdown-текста."""
+        write_bytes_buffered(output_path, self.render(md_text, title))
+
+    def render(self, md_text: str, title: str = "") -> bytes:
+        """Отрисовать PDF из Markdown-текста и вернуть его байты."""
         pdf = self.pdf
+        tokens = _tokenize(md_text)
+        self._register_fonts(_fonts_for_tokens(tokens))
+
         pdf.add_page()
 
         # Основной шрифт
         pdf.set_font("DejaVuSans", size=10)
 
-        lines = md_text.split('\n')
-        in_code_block = False
-        code_buffer = []
-
-        for line in lines:
-            # Code blocks
-            if line.strip().startswith('```'):
-                if in_code_block:
-                    # Закрытие блока кода
-                    self._render_code_block(code_buffer)
-                    code_buffer = []
-                    in_code_block = False
-                else:
-                    in_code_block = True
-                continue
-
-            if in_code_block:
-                code_buffer.append(line)
-                continue
-
-            stripped = line.strip()
-
-            # Пустая строка
-            if not stripped:
-                pdf.ln(4)
-                continue
-
-            # Заголовки
-            if stripped.startswith('#'):
-                level = len(stripped) - len(stripped.lstrip('#'))
-                text = stripped.lstrip('#').strip()
-                self._render_heading(text, level)
-                continue
-
-            # Горизонтальная линия
-            if stripped in ('---', '***', '___'):
+        for token in tokens:
+            kind = token[0]
+            if kind == "P":
+                # Обычный текст (с обработкой inline-элементов)
+                self._render_paragraph(token[1])
+            elif kind == "BLANK":
+                pdf.ln(4 * token[1])
+            elif kind == "H":
+                self._render_heading(token[2], token[1])
+            elif kind == "LI":
+                self._render_list_item(token[3], token[1], token[2])
+            elif kind == "TABLE":
+                self._render_table(token[1])
+            elif kind == "CODE":
+                self._render_code_block(token[1])
+            elif kind == "BQ":
+                self._render_blockquote(token[1])
+            elif kind == "HR":
                 pdf.ln(4)
                 x = pdf.get_x()
                 y = pdf.get_y()
                 pdf.set_draw_color(200, 200, 200)
                 pdf.line(x, y, x + pdf.epw, y)
                 pdf.ln(8)
-                continue
-
-            # Таблицы (простая обработка)
-            if stripped.startswith('|') and stripped.endswith('|'):
-                if re.match(r'^\|[\s\-:|]+\|$', stripped):
-                    continue  # Пропуск разделителя таблицы
-                cells = [c.strip() for c in stripped.split('|')[1:-1]]
-                self._render_table_row(cells)
-                continue
 
-            # Цитаты
-            if stripped.startswith('>'):
-                text = stripped.lstrip('>').strip()
-                self._render_blockquote(text)
-                continue
-
-            # Списки
-            list_match = re.match(r'^(\s*)([-*+]|\d+\.)\s+(.+)', line)
-            if list_match:
-                indent = len(list_match.group(1))
-                marker = list_match.group(2)
-                text = list_match.group(3)
-                self._render_list_item(text, indent, marker)
-                continue
-
-            # Обычный текст (с обработкой inline-элементов)
-            self._render_paragraph(stripped)
-
-        pdf.output(str(output_path))
+        return bytes(pdf.output())
 
     def _render_heading(self, text: str, level: int):
         pdf = self.pdf
@@ -421,7 +483,6 @@ class RuPDF:
         # Фон
         x = pdf.get_x()
         y = pdf.get_y()
-        code_text = '\n'.join(lines)
 
         pdf.set_fill_color(30, 30, 46)
         pdf.set_text_color(205, 214, 244)
@@ -440,14 +501,14 @@ class RuPDF:
         pdf.set_xy(x, y)
         pdf.rect(x, y, pdf.epw, total_h, 'F')
 
+        # Весь блок - одним multi_cell: переводы строк он обрабатывает сам
+        clean_lines = [self._clean_text(line) for line in lines]
+        code_text = '\n'.join(
+            clean if len(clean) <= 95 else clean[:92] + "..."
+            for clean in clean_lines
+        )
         pdf.set_xy(x + 6, y + 6)
-        for line in lines:
-            clean = self._clean_text(line)
-            if len(clean) > 95:
-                clean = clean[:92] + "..."
-            pdf.cell(0, line_h, clean)
-            pdf.ln(line_h)
-            pdf.set_x(x + 6)
+        pdf.multi_cell(pdf.epw - 12, line_h, code_text)
 
         pdf.set_xy(x, y + total_h + 4)
         pdf.set_font("DejaVuSans", size=10)
@@ -486,20 +547,27 @@ class RuPDF:
         pdf.multi_cell(pdf.epw - offset - 4, 6, bullet + self._clean_text(text))
         pdf.ln(1)
 
-    def _render_table_row(self, cells: list):
+    def _render_table(self, rows: list[tuple]):
         pdf = self.pdf
-        n_cols = len(cells)
-        if n_cols == 0:
-            return
-        col_w = pdf.epw / n_cols
-
+        # Шрифт переключается один раз на всю таблицу, а не на каждую строку
         pdf.set_font("DejaVuSans", size=9)
-        for cell in cells:
-            clean = self._clean_text(cell)
-            if len(clean) > 40:
-                clean = clean[:37] + "..."
-            pdf.cell(col_w, 7, clean, border=1)
-        pdf.ln()
+        col_widths = {}  # число колонок -> ширина колонки
+
+        for cells in rows:
+            n_cols = len(cells)
+            if n_cols == 0:
+                continue
+            col_w = col_widths.get(n_cols)
+            if col_w is None:
+                col_w = col_widths[n_cols] = pdf.epw / n_cols
+
+            for cell in cells:
+                clean = self._clean_text(cell)
+                if len(clean) > 40:
+                    clean = clean[:37] + "..."
+                pdf.cell(col_w, 7, clean, border=1)
+            pdf.ln()
+
         pdf.set_font("DejaVuSans", size=10)
 
     def _render_paragraph(self, text: str):
@@ -511,23 +579,173 @@ class RuPDF:
 
     def _clean_text(self, text: str) -> str:
         """Убрать Markdown-разметку из текста для PDF."""
-        # Bold/italic
-        text = re.sub(r'\*\*\*(.+?)\*\*\*', r'\1', text)
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        text = re.sub(r'__(.+?)__', r'\1', text)
-        text = re.sub(r'_(.+?)_', r'\1', text)
-        # Inline code
-        text = re.sub(r'`(.+?)`', r'\1', text)
-        # Links
-        text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)
-        # Images
-        text = re.sub(r'!\[(.+?)\]\(.+?\)', r'[\1]', text)
-        # Strikethrough
-        text = re.sub(r'~~(.+?)~~', r'\1', text)
-        # Em dash normalization
-        text = text.replace('-', '-')
-        return text
+        # Строки без разметки (обычная проза) - без regex и без кэша
+        if _RE_INLINE_TRIGGER.search(text) is None:
+            return text
+        return clean_inline(text)
+
+
+@lru_cache(maxsize=4096)
+def clean_inline(text: str) -> str:
+    """Убрать inline Markdown-разметку (кэшируется: строки часто повторяются)."""
+    # Bold/italic, inline code, ссылки, картинки, зачёркивание
+    text = _RE_INLINE.sub(_inline_repl, text)
+    # Em dash normalization
+    text = text.replace('-', '-')
+    return text
+
+
+def _inline_repl(match: re.Match) -> str:
+    """Замена для _RE_INLINE: содержимое без разметки (вложенная тоже снимается)."""
+    group = match.lastgroup
+    inner = match.group(group)
+    if group == "c":
+        return inner  # код — как есть
+    inner = _RE_INLINE.sub(_inline_repl, inner)
+    return f"[{inner}]" if group == "img" else inner
+
+
+# Построчный разбор: обработчик выбирается по первому символу строки,
+# регулярка запускается только если дешёвая проверка префикса прошла.
+# Обработчик возвращает токен, _SKIP (строку пропустить) или None (абзац).
+_SKIP = ()
+_HR_LINES = frozenset(('---', '***', '___'))
+
+
+def _tok_heading(stripped: str, line: str):
+    level = len(stripped) - len(stripped.lstrip('#'))
+    return ("H", level, stripped.lstrip('#').strip())
+
+
+def _tok_list(stripped: str, line: str):
+    list_match = _RE_LIST.match(line)
+    if list_match:
+        indent = len(list_match.group(1))
+        return ("LI", indent, list_match.group(2), list_match.group(3))
+    return None
+
+
+def _tok_rule_or_list(stripped: str, line: str):
+    # Горизонтальная линия
+    if stripped in _HR_LINES:
+        return ("HR",)
+    return _tok_list(stripped, line)
+
+
+def _tok_table(stripped: str, line: str):
+    # Таблицы (простая обработка)
+    if not stripped.endswith('|'):
+        return None
+    if _RE_TABLE_SEP.match(stripped):
+        return _SKIP  # Пропуск разделителя таблицы
+    return ("TR", tuple(c.strip() for c in stripped.split('|')[1:-1]))
+
+
+def _tok_quote(stripped: str, line: str):
+    return ("BQ", stripped.lstrip('>').strip())
+
+
+_LINE_DISPATCH = {
+    '#': _tok_heading,
+    '-': _tok_rule_or_list,
+    '*': _tok_rule_or_list,
+    '_': _tok_rule_or_list,
+    '+': _tok_list,
+    '|': _tok_table,
+    '>': _tok_quote,
+    **{d: _tok_list for d in '0123456789'},
+}
+
+
+def _tokenize(md_text: str) -> list[tuple]:
+    """Разобрать Markdown в плоский список блоков для RuPDF.generate.
+
+    Токены: ("H", level, text), ("CODE", lines), ("P", text),
+    ("LI", indent, marker, text), ("TABLE", [cells_tuple, ...]), ("BQ", text),
+    ("HR",), ("BLANK", count). Подряд идущие строки таблицы объединяются в
+    один TABLE, подряд идущие пустые строки - в один BLANK. Разделители
+    таблиц и незакрытый блок кода в конце файла токенов не дают.
+    """
+    tokens = []
+    # Строки текущего блока кода (None - вне блока). Список всех строк
+    # документа не строится - буферизуются только строки кода
+    code_buffer = None
+
+    for line in _iter_lines(md_text):
+        if code_buffer is not None:
+            if line.lstrip().startswith('```'):
+                # Закрытие блока кода
+                tokens.append(("CODE", code_buffer))
+                code_buffer = None
+            else:
+                code_buffer.append(line)
+            continue
+
+        # Code blocks
+        if line.lstrip().startswith('```'):
+            code_buffer = []
+            continue
+
+        token = _classify_line(line)
+        if not token:
+            continue
+        if token[0] == "BLANK" and tokens and tokens[-1][0] == "BLANK":
+            # Серия пустых строк - один отступ вместо pdf.ln на каждую
+            tokens[-1] = ("BLANK", tokens[-1][1] + 1)
+        elif token[0] == "TR":
+            # Подряд идущие строки таблицы собираются в один токен
+            if tokens and tokens[-1][0] == "TABLE":
+                tokens[-1][1].append(token[1])
+            else:
+                tokens.append(("TABLE", [token[1]]))
+        else:
+            tokens.append(token)
+
+    return tokens
+
+
+def _iter_lines(text: str):
+    """Строки текста по одной - как text.split('\\n'), но без списка всех строк."""
+    for line in io.StringIO(text):
+        yield line.rstrip('\n')
+    if not text or text.endswith('\n'):
+        yield ''
+
+
+@lru_cache(maxsize=8192)
+def _classify_line(line: str) -> tuple:
+    """Токен для строки вне блока кода (кэшируется: пустые строки,
+    разделители и типовые пункты списков повторяются)."""
+    stripped = line.strip()
+
+    # Пустая строка
+    if not stripped:
+        return ("BLANK", 1)
+
+    handler = _LINE_DISPATCH.get(stripped[0])
+    token = handler(stripped, line) if handler else None
+    if token is None:
+        # Обычный текст (с обработкой inline-элементов)
+        return ("P", stripped)
+    return token
+
+
+# Какие начертания нужны для каждого типа блока (обычный текст - всегда)
+_TOKEN_FONTS = {
+    "H": ("DejaVuSans", "B"),
+    "BQ": ("DejaVuSans", "I"),
+    "CODE": ("DejaVuMono", ""),
+}
+
+
+def _fonts_for_tokens(tokens: list[tuple]) -> set[tuple[str, str]]:
+    """Набор (family, style), которые используют рендереры для этих токенов."""
+    needed = {("DejaVuSans", "")}
+    kinds = {token[0] for token in tokens}
+    for kind, font in _TOKEN_FONTS.items():
+        if kind in kinds:
+            needed.add(font)
+    return needed
 
 
 def md_to_pdf(md_text: str, output_path: Path, title: str = ""):
@@ -559,30 +777,168 @@ def get_md_files(input_dir: Path, specific_file: str = None) -> list[Path]:
     return files
 
 
-def convert_file(md_path: Path, output_dir: Path, formats: list[str]) -> dict:
-    """Конвертировать один .md файл в указанные форматы."""
-    md_text = md_path.read_text(encoding="utf-8")
-    stem = md_path.stem
-    title_match = re.search(r'^#\s+(.+)', md_text, re.MULTILINE)
-    title = title_match.group(1).strip() if title_match else stem
+# Файлы крупнее порога читаются через mmap
+MMAP_MIN_SIZE = 256 * 1024
+
+
+def read_markdown(md_path: Path) -> str:
+    """Прочитать .md файл; большие файлы - через mmap без промежуточного буфера.
+
+    Переводы строк нормализуются так же, как в read_text (\r\n, \r -> \n).
+    """
+    size = md_path.stat().st_size
+    if size < MMAP_MIN_SIZE:
+        return md_path.read_text(encoding="utf-8")
+
+    with open(md_path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = str(mm, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def output_path_for(md_path: Path, output_dir: Path, fmt: str) -> Path:
+    """Путь выходного файла формата fmt для md_path."""
+    if fmt == "md":
+        return output_dir / "md" / md_path.name
+    return output_dir / fmt / f"{md_path.stem}.{fmt}"
+
+
+# ---------------------------------------------------------------------------
+# Инкрементальная сборка
+# ---------------------------------------------------------------------------
+
+# Манифест в выходной папке: путь .md -> mtime, размер, sha256, форматы
+MANIFEST_NAME = ".convert-manifest.json"
+
+
+def load_manifest(output_dir: Path) -> dict:
+    """Загрузить манифест прошлой сборки (пустой, если нет или поврежден)."""
+    try:
+        data = json.loads((output_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_manifest(output_dir: Path, manifest: dict):
+    """Сохранить манифест сборки."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / MANIFEST_NAME).write_text(
+        json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True),
+        encoding="utf-8",
+    )
+
+
+def file_sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def check_unchanged(md_path: Path, output_dir: Path, formats: list[str],
+                    manifest: dict) -> tuple[bool, dict]:
+    """Проверить, можно ли пропустить файл. Вернуть (пропустить, новая запись).
+
+    Хеш считается только если mtime или размер отличаются от манифеста:
+    файл мог быть просто "тронут" без изменения содержимого.
+    """
+    stat = md_path.stat()
+    fresh = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+    entry = manifest.get(str(md_path.resolve()))
+    if not entry:
+        return False, fresh
+
+    if entry.get("mtime") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+        fresh["sha256"] = entry.get("sha256")
+    else:
+        fresh["sha256"] = file_sha256(md_path)
+    if not fresh["sha256"] or fresh["sha256"] != entry.get("sha256"):
+        return False, fresh
+
+    built = entry.get("formats", [])
+    fresh["formats"] = built
+    unchanged = all(
+        fmt in built and output_path_for(md_path, output_dir, fmt).exists()
+        for fmt in formats
+    )
+    return unchanged, fresh
+
+
+def update_manifest(manifest: dict, md_path: Path, fresh: dict, result: dict):
+    """Записать в манифест успешно сконвертированный файл."""
+    key = str(md_path.resolve())
+    if result["errors"]:
+        manifest.pop(key, None)
+        return
+    if not fresh.get("sha256"):
+        fresh["sha256"] = file_sha256(md_path)
+    built = set(fresh.get("formats", ()))
+    built.update(fmt for fmt, _ in result["formats"])
+    manifest[key] = {**fresh, "formats": sorted(built)}
+
+
+# Сколько файлов читатель держит впереди конвейера
+PIPELINE_DEPTH = 4
+
+
+def prefetch_markdown(files: list[Path], depth: int = PIPELINE_DEPTH):
+    """Читать .md файлы в фоновом потоке, опережая обработку на depth файлов.
+
+    Пока основной поток рендерит файл N, читатель уже загружает N+1..N+depth.
+    Ошибка чтения пробрасывается в момент, когда до файла доходит очередь.
+    """
+    q = queue.Queue(maxsize=depth)
+
+    def reader():
+        for md_path in files:
+            try:
+                q.put((md_path, read_markdown(md_path), None))
+            except Exception as e:
+                q.put((md_path, None, e))
+                return
+
+    threading.Thread(target=reader, name="md-reader", daemon=True).start()
+    for _ in files:
+        md_path, md_text, error = q.get()
+        if error is not None:
+            raise error
+        yield md_path, md_text
+
+
+def convert_file(md_path: Path, output_dir: Path, formats: list[str],
+                 md_text: str | None = None, writer=None) -> dict:
+    """Конвертировать один .md файл в указанные форматы.
+
+    md_text - уже прочитанный текст (из prefetch_markdown).
+    writer - executor для фоновой записи; тогда запись завершает finish_writes().
+    """
+    if md_text is None:
+        md_text = read_markdown(md_path)
+    title = extract_title(md_text, default=md_path.stem)
 
     result = {"file": md_path.name, "formats": [], "errors": []}
+    pending = []
+
+    def emit(fmt: str, path: Path, data: bytes):
+        if writer is None:
+            write_bytes_buffered(path, data)
+            result["formats"].append((fmt, path))
+        else:
+            pending.append((fmt, path, writer.submit(write_bytes_buffered, path, data)))
 
     # MD (копия в выходную папку)
     if "md" in formats:
-        md_out = output_dir / "md" / md_path.name
+        md_out = output_path_for(md_path, output_dir, "md")
         md_out.parent.mkdir(parents=True, exist_ok=True)
-        md_out.write_text(md_text, encoding="utf-8")
-        result["formats"].append(("md", md_out))
+        emit("md", md_out, md_text.encode("utf-8"))
 
     # HTML
     if "html" in formats:
         try:
-            html_out = output_dir / "html" / f"{stem}.html"
+            html_out = output_path_for(md_path, output_dir, "html")
             html_out.parent.mkdir(parents=True, exist_ok=True)
             html_content = md_to_html(md_text, title)
-            html_out.write_text(html_content, encoding="utf-8")
-            result["formats"].append(("html", html_out))
+            emit("html", html_out, html_content.encode("utf-8"))
         except Exception as e:
             result["errors"].append(f"HTML: {e}")
             log(f"  Ошибка HTML: {e}", "ERROR")
@@ -590,17 +946,40 @@ def convert_file(md_path: Path, output_dir: Path, formats: list[str]) -> dict:
     # PDF
     if "pdf" in formats:
         try:
-            pdf_out = output_dir / "pdf" / f"{stem}.pdf"
+            pdf_out = output_path_for(md_path, output_dir, "pdf")
             pdf_out.parent.mkdir(parents=True, exist_ok=True)
-            md_to_pdf(md_text, pdf_out, title)
-            result["formats"].append(("pdf", pdf_out))
+            emit("pdf", pdf_out, RuPDF(font_dir=FONT_DIR).render(md_text, title))
         except Exception as e:
             result["errors"].append(f"PDF: {e}")
             log(f"  Ошибка PDF: {e}", "ERROR")
 
+    if pending:
+        result["pending"] = pending
+    return result
+
+
+def finish_writes(result: dict) -> dict:
+    """Дождаться фоновой записи файлов результата convert_file."""
+    for fmt, path, future in result.pop("pending", ()):
+        try:
+            future.result()
+            result["formats"].append((fmt, path))
+        except Exception as e:
+            result["errors"].append(f"{fmt.upper()}: {e}")
+            log(f"  Ошибка записи {fmt.upper()}: {e}", "ERROR")
     return result
 
 
+def log_result_paths(result: dict):
+    """Вывести пути созданных файлов для одного результата convert_file."""
+    for fmt, path in result["formats"]:
+        try:
+            display_path = path.relative_to(ROOT)
+        except ValueError:
+            display_path = path
+        log(f"  {fmt.upper()}: {display_path}", "OK")
+
+
 def show_results(results: list[dict]):
     """Показать итоговую таблицу."""
     if HAS_RICH:
@@ -874,6 +1253,8 @@ def main():
   python convert.py --format pdf           # только PDF
   python convert.py --format html          # только HTML
   python convert.py --input docs_ru        # указать входную папку
+  python convert.py --workers 1            # без параллельной обработки
+  python convert.py --force                # пересобрать все, без пропуска
         """
     )
     parser.add_argument("--file", help="Конвертировать конкретный файл")
@@ -885,6 +1266,10 @@ def main():
                         help="Выходная папка (по умолчанию: output)")
     parser.add_argument("--no-interactive", action="store_true",
                         help="Отключить интерактивный режим")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Число параллельных процессов (по умолчанию: число ядер, 1 = последовательно)")
+    parser.add_argument("--force", action="store_true",
+                        help="Пересобрать все файлы, даже не изменившиеся")
 
     args = parser.parse_args()
 
@@ -937,20 +1322,69 @@ def main():
     if not files:
         return
 
+    # Пропустить файлы, не изменившиеся с прошлой сборки
+    manifest = load_manifest(output_dir)
+    fresh_entries = {}
+    if not args.force:
+        todo = []
+        for md_path in files:
+            unchanged, fresh_entries[md_path] = check_unchanged(
+                md_path, output_dir, formats, manifest)
+            if unchanged:
+                # Обновить mtime, чтобы в следующий раз не считать хеш заново
+                manifest[str(md_path.resolve())].update(fresh_entries[md_path])
+            else:
+                todo.append(md_path)
+        skipped = len(files) - len(todo)
+        if skipped:
+            log(f"Без изменений, пропущено: {skipped} (--force для полной пересборки)")
+        if not todo:
+            save_manifest(output_dir, manifest)
+            log("Все файлы актуальны", "OK")
+            return
+        files = todo
+
     log(f"Файлов для конвертации: {len(files)}")
 
     # Конвертация
-    results = []
-    for i, md_path in enumerate(files, 1):
-        log(f"[{i}/{len(files)}] {md_path.name}...")
-        result = convert_file(md_path, output_dir, formats)
-        results.append(result)
-        for fmt, path in result["formats"]:
-            try:
-                display_path = path.relative_to(ROOT)
-            except ValueError:
-                display_path = path
-            log(f"  {fmt.upper()}: {display_path}", "OK")
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(files)))
+    results = [None] * len(files)
+
+    if workers == 1:
+        # Конвейер: чтение следующих файлов и запись предыдущего идут
+        # в фоновых потоках, пока текущий файл рендерится
+        def report(idx: int):
+            finish_writes(results[idx])
+            log(f"[{idx + 1}/{len(files)}] {files[idx].name}")
+            log_result_paths(results[idx])
+
+        with ThreadPoolExecutor(max_workers=1) as writer:
+            for idx, (md_path, md_text) in enumerate(prefetch_markdown(files)):
+                results[idx] = convert_file(md_path, output_dir, formats,
+                                            md_text=md_text, writer=writer)
+                if idx:
+                    report(idx - 1)
+            report(len(files) - 1)
+    else:
+        log(f"Параллельно: {workers} процессов")
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = {
+                ex.submit(convert_file, md_path, output_dir, formats): idx
+                for idx, md_path in enumerate(files)
+            }
+            for done, fut in enumerate(as_completed(futures), 1):
+                idx = futures[fut]
+                log(f"[{done}/{len(files)}] {files[idx].name}")
+                results[idx] = fut.result()
+                log_result_paths(results[idx])
+
+    for md_path, result in zip(files, results):
+        fresh = fresh_entries.get(md_path)
+        if fresh is None:
+            stat = md_path.stat()
+            fresh = {"mtime": stat.st_mtime_ns, "size": stat.st_size}
+        update_manifest(manifest, md_path, fresh, result)
+    save_manifest(output_dir, manifest)
 
     show_results(results)
 
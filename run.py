@@ -15,23 +15,56 @@ run.py - Единый пайплайн: документ на входе -> пе
     python run.py --input report.pdf       # один файл
     python run.py --lang en-de             # английский -> немецкий
     python run.py --dry-run                # только оценить стоимость
+    python run.py --max-parallel 8         # до 8 запросов к API одновременно
     python run.py --no-interactive         # для скриптов/CI
 
 Переменные окружения:
     ANTHROPIC_API_KEY  - ключ API (обязателен для перевода)
     TRANSLATE_MODEL    - модель (по умолчанию: claude-sonnet-4-5-20250929)
+    PDF_BACKEND        - чтение PDF: pdfplumber (по умолчанию) или pymupdf
 """
 
 import argparse
+import atexit
+import importlib.util
+import io
 import json
+import mmap
 import os
 import re
 import signal
 import sys
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache, partial
 from pathlib import Path
 from datetime import datetime
 
+# ---------------------------------------------------------------------------
+# orjson (опционально) - быстрый разбор и запись JSON
+# ---------------------------------------------------------------------------
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def json_loads_file(path: Path):
+    """Прочитать JSON-файл через orjson (если установлен) или stdlib json."""
+    if HAS_ORJSON:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def json_dumps_bytes(obj) -> bytes:
+    """Сериализовать в UTF-8 JSON с отступом 2 (orjson или stdlib json)."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
 # ---------------------------------------------------------------------------
 # Config - сохраняется между запусками
 # ---------------------------------------------------------------------------
@@ -42,21 +75,37 @@ def load_config() -> dict:
     defaults = {"ui_lang": None, "last_lang_pair": "en-ru", "last_output_dir": str(ROOT / "output")}
     if CONFIG_PATH.exists():
         try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                saved = json.load(f)
-            defaults.update(saved)
+            defaults.update(json_loads_file(CONFIG_PATH))
         except Exception:
             pass
     return defaults
 
 def save_config(cfg: dict):
+    """Записать конфиг атомарно: во временный файл, затем os.replace.
+
+    Прерывание посреди записи оставляет прежний .run_config.json целым.
+    """
+    tmp_path = CONFIG_PATH.with_name(CONFIG_PATH.name + ".tmp")
     try:
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, ensure_ascii=False, indent=2)
+        tmp_path.write_bytes(json_dumps_bytes(cfg))
+        os.replace(tmp_path, CONFIG_PATH)
     except Exception:
         pass
 
 _config = load_config()
+_config_dirty = False
+
+def update_config(**values):
+    """Изменить настройки в памяти; на диск они пишутся один раз при выходе."""
+    global _config_dirty
+    _config.update(values)
+    _config_dirty = True
+
+def _flush_config():
+    if _config_dirty:
+        save_config(_config)
+
+atexit.register(_flush_config)
 
 # ---------------------------------------------------------------------------
 # i18n - двуязычный интерфейс (ru / en)
@@ -259,6 +308,10 @@ UI_STRINGS = {
         "ru": "Глоссарий: {n} терминов",
         "en": "Glossary: {n} terms",
     },
+    "glossary_missing": {
+        "ru": "глоссарий: нет канонического перевода для {n} терм.: {terms}",
+        "en": "glossary: canonical translation missing for {n} terms: {terms}",
+    },
     "empty_file": {
         "ru": "Пустой файл или ошибка чтения",
         "en": "Empty file or read error",
@@ -467,20 +520,17 @@ def t(key: str, **kwargs) -> str:
 def set_ui_lang(lang: str):
     global _ui_lang
     _ui_lang = lang
-    _config["ui_lang"] = lang
-    save_config(_config)
+    update_config(ui_lang=lang)
 
 # ---------------------------------------------------------------------------
 # Rich / Fallback
 # ---------------------------------------------------------------------------
+# Table/Panel/box нужны только прогнозу, заставке меню и итогам -
+# импортируются там, где используются
 try:
     from rich.console import Console
-    from rich.table import Table
-    from rich.panel import Panel
-    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn
-    from rich.prompt import Prompt, Confirm, IntPrompt
+    from rich.prompt import Prompt, Confirm
     from rich.rule import Rule
-    from rich import box
     HAS_RICH = True
 except ImportError:
     HAS_RICH = False
@@ -511,14 +561,16 @@ REQUIRED_PACKAGES = {
 }
 
 def check_dependencies() -> list[str]:
-    """Check required packages. Returns list of missing package names."""
-    missing = []
-    for module, pip_name in REQUIRED_PACKAGES.items():
-        try:
-            __import__(module)
-        except ImportError:
-            missing.append(pip_name)
-    return missing
+    """Check required packages. Returns list of missing package names.
+
+    find_spec only locates the module on sys.path without importing it:
+    importing anthropic/pdfplumber/docx just to check presence costs
+    hundreds of milliseconds at startup.
+    """
+    return [
+        pip_name for module, pip_name in REQUIRED_PACKAGES.items()
+        if importlib.util.find_spec(module) is None
+    ]
 
 def run_dependency_check():
     """Check and report missing dependencies."""
@@ -540,6 +592,9 @@ def run_dependency_check():
 # ---------------------------------------------------------------------------
 FONT_DIR = ROOT / "fonts"
 GLOSSARY_PATH = ROOT / "glossary.json"
+# Колонки glossary.json (term_en -> term_ru): проверка терминов в переводе
+# имеет смысл только для этой языковой пары
+GLOSSARY_LANG_PAIR = "en-ru"
 GLOSSARY_CANDIDATES_PATH = ROOT / "glossary_candidates.json"
 TRANSLATE_SPEC = ROOT / "TRANSLATE.md"
 HUMANIZER_SPEC = ROOT / "HUMANIZER.md"
@@ -557,11 +612,30 @@ DEFAULT_MODEL = "claude-sonnet-4-5-20250929"
 MAX_OUTPUT_TOKENS = 16384
 CHUNK_SIZE_CHARS = 40000
 
+# Параллельный перевод: одновременных запросов к API и лимит запросов в минуту.
+# По умолчанию фиксированного лимита нет: темп задают заголовки
+# anthropic-ratelimit-* ответов (см. RequestThrottle.observe)
+DEFAULT_MAX_PARALLEL = 4
+DEFAULT_RPM = 0
+# Повторы SDK при 429/5xx (экспоненциальная задержка внутри anthropic)
+API_MAX_RETRIES = 5
+
 # Стоимость (USD за 1M токенов) - Sonnet 4.5
 COST_INPUT_PER_M = 3.0
 COST_OUTPUT_PER_M = 15.0
+# Кэш промптов: запись в кэш дороже обычного входа, чтение - в 10 раз дешевле
+COST_CACHE_WRITE_PER_M = 3.75
+COST_CACHE_READ_PER_M = 0.30
 AVG_SECONDS_PER_1K_CHARS = 3.5
 
+# Символов на токен по языку текста (для прогноза без токенизатора).
+# Латиница плотнее кириллицы, в CJK токен - примерно один иероглиф
+CHARS_PER_TOKEN = {
+    "en": 3.8, "de": 3.4, "fr": 3.5, "es": 3.5, "pt": 3.5,
+    "ru": 2.6, "zh": 1.2, "ja": 1.3,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.0
+
 # Языковые пары
 LANGUAGES = {
     "en-ru": ("английского", "русский", "English", "Russian"),
@@ -578,7 +652,58 @@ LANGUAGES = {
 }
 
 # Поддерживаемые форматы ввода
-INPUT_EXTENSIONS = {'.md', '.markdown', '.txt', '.docx', '.doc', '.pdf'}
+INPUT_EXTENSIONS = frozenset({'.md', '.markdown', '.txt', '.docx', '.doc', '.pdf'})
+# Наборы выходных форматов: --format и пункты простого (без rich) меню
+_ALL_FORMATS = ("md", "html", "pdf", "docx")
+_FMT_MAP = {
+    "all": _ALL_FORMATS,
+    "pdf": ("pdf",), "docx": ("docx",), "html": ("html",), "md": ("md",),
+    "gdocs": ("docx", "gdocs"),
+    "all+gdocs": _ALL_FORMATS + ("gdocs",),
+}
+_MENU_FMT_MAP = {"1": _ALL_FORMATS, "2": ("pdf", "docx"),
+                 "3": ("pdf",), "4": ("docx",), "5": ("md",),
+                 "6": _ALL_FORMATS + ("gdocs",), "7": ("docx", "gdocs")}
+# Языковые пары простого меню
+_MENU_LANG_MAP = {"1": "en-ru", "2": "ru-en", "3": "en-de", "4": "en-es", "5": "en-fr"}
+
+# Каталоги, которые не обходятся при поиске входных файлов
+SCAN_SKIP_DIRS = frozenset({'.git', '__pycache__', 'fonts', 'output', 'node_modules', '.venv', 'venv'})
+
+# Извлечение текста из PDF: pdfplumber или pymupdf (C-библиотека, в разы быстрее)
+PDF_BACKEND = os.environ.get("PDF_BACKEND", "pdfplumber").strip().lower()
+# С какого числа страниц pdfplumber запускается в нескольких процессах
+PDF_PARALLEL_MIN_PAGES = 16
+
+# ---------------------------------------------------------------------------
+# Регулярные выражения (компилируются один раз)
+# ---------------------------------------------------------------------------
+_RICH_TAG_RE = re.compile(r'\[/?[^\]]*\]')
+_IMG_RE = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+# Граница секции для разбивки на чанки: перевод строки перед "## "
+_H2_SPLIT_RE = re.compile(r'\n## ')
+# Заголовок документа: первая строка "# ..."
+_TITLE_RE = re.compile(r'^#\s+(.+)', re.MULTILINE)
+
+# Строчная разметка Markdown (dedup_lines, cleanup_markdown, генераторы PDF/DOCX)
+_HEADING_RE = re.compile(r'^(#{1,6})\s')
+_LIST_ITEM_RE = re.compile(r'^(\s*)([-*+]|\d+\.)\s+')
+_LIST_ITEM_TEXT_RE = re.compile(r'^(\s*)([-*+]|\d+\.)\s+(.+)')
+_BULLET_ITEM_RE = re.compile(r'^(\s*)([-*+])\s+(.+)')
+_NUMBERED_ITEM_RE = re.compile(r'^(\s*)\d+\.\s+(.+)')
+_TABLE_SEP_RE = re.compile(r'^\|[\s\-:|]+\|$')
+# Первые символы строк, которые могут начинать блок (cleanup_markdown)
+_BLOCK_START_CHARS = frozenset('#|>-*+_!`')
+# Строка (уже strip), прерывающая абзац: заголовок, таблица, ```, цитата,
+# горизонтальная линия, картинка. Списки проверяет _LIST_ITEM_RE по исходной строке
+_BLOCK_BREAK_RE = re.compile(r'#{1,6}\s|\|(?:.*\|)?$|```|>|(?:---|\*\*\*|___)$|!\[')
+
+# Строчная разметка для PDF/DOCX одной альтернацией: картинка, ссылка,
+# ***, **, *, `код` (порядок важен - картинка раньше ссылки)
+_INLINE_MD_RE = re.compile(
+    r'!\[(.+?)\]\([^)]+\)|\[(.+?)\]\([^)]+\)'
+    r'|\*\*\*(.+?)\*\*\*|\*\*(.+?)\*\*|\*(.+?)\*|`(.+?)`'
+)
 
 # ---------------------------------------------------------------------------
 # Graceful interrupt
@@ -606,16 +731,28 @@ def ui_print(msg: str, **kwargs):
     if HAS_RICH:
         console.print(msg, **kwargs)
     else:
-        clean = re.sub(r'\[/?[^\]]*\]', '', str(msg))
-        print(clean)
+        msg = str(msg)
+        # Без "[" разметки rich нет - regex не нужен
+        print(_RICH_TAG_RE.sub('', msg) if '[' in msg else msg)
+
+
+_LOG_COLORS = {"INFO": "cyan", "WARN": "yellow", "ERROR": "red", "OK": "green",
+               "STEP": "magenta"}
+
+
+# Сообщения log() из потока, читающего файл, копятся здесь (см.
+# read_input_file_buffered), чтобы main вывел их по порядку файлов
+_log_buffer = threading.local()
 
 
 def log(msg: str, level: str = "INFO"):
+    buffered = getattr(_log_buffer, "messages", None)
+    if buffered is not None:
+        buffered.append((msg, level))
+        return
     ts = datetime.now().strftime("%H:%M:%S")
     if HAS_RICH:
-        colors = {"INFO": "cyan", "WARN": "yellow", "ERROR": "red", "OK": "green",
-                  "STEP": "magenta"}
-        c = colors.get(level, "white")
+        c = _LOG_COLORS.get(level, "white")
         console.print(f"[dim]{ts}[/] [{c}]{level:>5}[/]  {msg}")
     else:
         print(f"[{ts}] [{level}] {msg}")
@@ -626,24 +763,48 @@ def log(msg: str, level: str = "INFO"):
 # ---------------------------------------------------------------------------
 
 def load_json(path: Path) -> list:
-    if not path.exists():
+    """Список из JSON-файла ([] если файла нет или он битый).
+
+    Разобранный файл кэшируется по (путь, mtime, размер): повторные вызовы
+    в том же процессе не читают его заново, пока файл не изменится.
+    Возвращаемый список общий - не изменять.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
         return []
+    return _load_json_cached(path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _load_json_cached(path: Path, mtime_ns: int, size: int) -> list:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = json_loads_file(path)
         return data if isinstance(data, list) else []
     except (json.JSONDecodeError, Exception):
         return []
 
 
-def estimate_tokens(text: str) -> int:
-    return len(text) // 3
+def estimate_tokens(text: str, lang: str = None) -> int:
+    """Оценка числа токенов без токенизатора: символы / CHARS_PER_TOKEN[lang].
+
+    lang=None - усредненный коэффициент (3 символа на токен).
+    """
+    return int(len(text) / CHARS_PER_TOKEN.get(lang, DEFAULT_CHARS_PER_TOKEN))
 
 
 def calc_cost(input_tokens: int, output_tokens: int) -> float:
     return (input_tokens * COST_INPUT_PER_M + output_tokens * COST_OUTPUT_PER_M) / 1_000_000
 
 
+def calc_usage_cost(usage) -> float:
+    """Стоимость одного ответа API с учетом записи и чтения кэша промптов."""
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    return (calc_cost(usage.input_tokens, usage.output_tokens)
+            + (cache_write * COST_CACHE_WRITE_PER_M + cache_read * COST_CACHE_READ_PER_M) / 1_000_000)
+
+
 def format_duration(seconds: float) -> str:
     if seconds < 60:
         return f"{seconds:.0f} {t('sec')}"
@@ -669,17 +830,61 @@ def format_size(size_bytes: int) -> str:
 # STEP 1: Input - чтение файлов любого формата
 # ---------------------------------------------------------------------------
 
+def _extract_pdf_pages(path_str: str, start: int, end: int) -> list[str]:
+    """Текст страниц [start, end) через pdfplumber.
+
+    Выполняется и в дочерних процессах: объекты страниц pdfplumber не
+    сериализуются, поэтому каждый процесс открывает PDF сам. Кэш страницы
+    сбрасывается сразу после извлечения - память не растет с числом страниц.
+    """
+    import pdfplumber
+    texts = []
+    with pdfplumber.open(path_str) as pdf:
+        for page in pdf.pages[start:end]:
+            texts.append(page.extract_text() or "")
+            page.flush_cache()
+    return texts
+
+
+def _extract_pdf_pdfplumber(path: Path) -> list[str]:
+    """Текст всех страниц; большие PDF - диапазонами страниц в пуле процессов."""
+    import pdfplumber
+    with pdfplumber.open(str(path)) as pdf:
+        n_pages = len(pdf.pages)
+
+    workers = min(os.cpu_count() or 1, n_pages // PDF_PARALLEL_MIN_PAGES)
+    if workers <= 1:
+        return _extract_pdf_pages(str(path), 0, n_pages)
+
+    step = -(-n_pages // workers)
+    starts = list(range(0, n_pages, step))
+    ends = [min(start + step, n_pages) for start in starts]
+    # multiprocessing грузится только для больших PDF
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(_extract_pdf_pages, [str(path)] * len(starts), starts, ends)
+        return [text for part in parts for text in part]
+
+
+def _extract_pdf_pymupdf(path: Path) -> list[str]:
+    """Текст всех страниц через PyMuPDF (fitz)."""
+    import fitz
+    with fitz.open(str(path)) as doc:
+        return [page.get_text("text") for page in doc]
+
+
 def extract_text_from_pdf(path: Path) -> str:
-    """Извлечь текст из PDF."""
+    """Извлечь текст из PDF (бэкенд - PDF_BACKEND)."""
     try:
-        import pdfplumber
-        texts = []
-        with pdfplumber.open(str(path)) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    texts.append(text)
-        return "\n\n".join(texts)
+        texts = None
+        if PDF_BACKEND == "pymupdf":
+            try:
+                texts = _extract_pdf_pymupdf(path)
+            except ImportError:
+                log("PyMuPDF не установлен (pip install pymupdf), используется pdfplumber", "WARN")
+        if texts is None:
+            texts = _extract_pdf_pdfplumber(path)
+        return "\n\n".join(text for text in texts if text)
     except ImportError:
         log("Установите pdfplumber: pip install pdfplumber", "ERROR")
         return ""
@@ -692,13 +897,23 @@ def extract_text_from_docx(path: Path) -> str:
     """Извлечь текст из DOCX."""
     try:
         from docx import Document as DocxDocument
+        from docx.enum.style import WD_STYLE_TYPE
+        from docx.oxml.ns import qn
         doc = DocxDocument(str(path))
+
+        # para.style ищет стиль в styles.xml заново для каждого абзаца -
+        # таблица id -> имя строится один раз, абзацы читаются напрямую из XML
+        style_names = {s.style_id: s.name for s in doc.styles
+                       if s.type == WD_STYLE_TYPE.PARAGRAPH}
+        default_style = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        default_name = default_style.name if default_style is not None else ""
+
         paragraphs = []
-        for para in doc.paragraphs:
-            text = para.text.strip()
+        for p in doc.element.body.iterchildren(qn("w:p")):
+            text = p.text.strip()
             if text:
                 # Сохранить стиль заголовков
-                style = para.style.name if para.style else ""
+                style = style_names.get(p.style, default_name) or ""
                 if "Heading 1" in style:
                     paragraphs.append(f"# {text}")
                 elif "Heading 2" in style:
@@ -732,12 +947,34 @@ def extract_text_from_docx(path: Path) -> str:
         return ""
 
 
+# Текстовые файлы крупнее порога читаются через mmap
+MMAP_MIN_SIZE = 1024 * 1024
+
+
+def read_text_file(path: Path) -> str:
+    """Прочитать .md/.txt; большие файлы - через mmap.
+
+    read_text сначала читает весь файл в bytes, потом декодирует - в пике
+    две копии. Из mmap строка декодируется напрямую, без буфера bytes.
+    Переводы строк нормализуются так же, как в read_text (\r\n, \r -> \n).
+    """
+    if path.stat().st_size < MMAP_MIN_SIZE:
+        return path.read_text(encoding="utf-8")
+
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = str(mm, "utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
 def read_input_file(path: Path) -> tuple[str, str]:
     """Прочитать файл любого формата. Возвращает (text, original_format)."""
     ext = path.suffix.lower()
 
     if ext in ('.md', '.markdown', '.txt'):
-        text = path.read_text(encoding="utf-8")
+        text = read_text_file(path)
         return text, "md"
 
     elif ext == '.pdf':
@@ -757,9 +994,22 @@ def read_input_file(path: Path) -> tuple[str, str]:
         return "", "unknown"
 
 
+def read_input_file_buffered(path: Path) -> tuple[str, str, list[tuple[str, str]]]:
+    """read_input_file для пула потоков: сообщения log() не печатаются сразу,
+    а возвращаются списком (msg, level). Возвращает (text, format, messages)."""
+    _log_buffer.messages = messages = []
+    try:
+        text, fmt = read_input_file(path)
+    finally:
+        _log_buffer.messages = None
+    return text, fmt, messages
+
+
 def detect_images(text: str) -> list[tuple[str, str]]:
     """Find all image references ![alt](path) in Markdown text."""
-    return re.findall(r'!\[([^\]]*)\]\(([^)]+)\)', text)
+    if "![" not in text:
+        return []
+    return _IMG_RE.findall(text)
 
 
 def discover_input_files(input_path: Path) -> list[Path]:
@@ -772,10 +1022,15 @@ def discover_input_files(input_path: Path) -> list[Path]:
             return []
 
     if input_path.is_dir():
+        # Один проход scandir вместо glob на каждое расширение; тип файла
+        # берется из DirEntry без лишнего stat
         files = []
-        for ext in INPUT_EXTENSIONS:
-            files.extend(input_path.glob(f"*{ext}"))
-        return sorted(set(files))
+        with os.scandir(input_path) as it:
+            for entry in it:
+                if (os.path.splitext(entry.name)[1].lower() in INPUT_EXTENSIONS
+                        and entry.is_file()):
+                    files.append(Path(entry.path))
+        return sorted(files)
 
     log(f"Путь не найден: {input_path}", "ERROR")
     return []
@@ -785,9 +1040,76 @@ def discover_input_files(input_path: Path) -> list[Path]:
 # STEP 2: Translation - перевод через Claude API
 # ---------------------------------------------------------------------------
 
-def build_system_prompt(lang_pair: str, glossary: list) -> str:
-    """Построить системный промпт для выбранной языковой пары."""
-    lang_from, lang_to, _, _ = LANGUAGES.get(lang_pair, LANGUAGES["en-ru"])
+@lru_cache(maxsize=None)
+def _read_spec(path: Path) -> str | None:
+    """Текст TRANSLATE.md / HUMANIZER.md (читается с диска один раз)."""
+    if not path.exists():
+        return None
+    return path.read_text(encoding="utf-8")
+
+
+def build_system_prompt(lang_tuple: tuple, glossary: list,
+                        glossary_pairs: tuple[tuple[str, str], ...] = None) -> str:
+    """Построить системный промпт для выбранной языковой пары.
+
+    lang_tuple - запись LANGUAGES (уже выбранная вызывающим кодом).
+    glossary_pairs - glossary_term_pairs(glossary), если уже посчитаны.
+    Промпт кэшируется по языковой паре и содержимому глоссария.
+    """
+    if glossary_pairs is None:
+        glossary_pairs = glossary_term_pairs(glossary)
+    return _build_system_prompt(lang_tuple, bool(glossary), glossary_pairs)
+
+
+def glossary_term_pairs(glossary: list) -> tuple[tuple[str, str], ...]:
+    """Пары (термин, перевод) из записей glossary.json."""
+    return tuple(
+        (e.get('term_en', e.get('term', '')), e.get('term_ru', e.get('translation', '')))
+        for e in glossary if isinstance(e, dict)
+    )
+
+
+@lru_cache(maxsize=4)
+def _glossary_matcher(glossary_pairs: tuple[tuple[str, str], ...]):
+    """Одно регулярное выражение на все термины глоссария и основы переводов.
+
+    Термины ищутся за один проход по тексту (альтернация, длинные термины
+    первыми), а не отдельным поиском на каждый термин. Перевод считается
+    найденным, если в тексте есть основы всех его слов (окончания в
+    русском меняются: "контекстное окно" -> "контекстного окна").
+    """
+    stems = {}
+    for term, translation in glossary_pairs:
+        if term.strip() and translation.strip():
+            stems[term.lower()] = tuple(
+                w[:-2] if len(w) > 5 else w[:-1] if len(w) > 3 else w
+                for w in translation.lower().split()
+            )
+    if not stems:
+        return None, stems
+    alternation = "|".join(re.escape(term) for term in sorted(stems, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE), stems
+
+
+def find_missing_glossary_terms(source_text: str, translated_text: str,
+                                glossary_pairs: tuple[tuple[str, str], ...]) -> list[str]:
+    """Термины глоссария из исходника, канонический перевод которых
+    не встретился в переводе."""
+    pattern, stems = _glossary_matcher(glossary_pairs)
+    if pattern is None:
+        return []
+    found = {m.group(0).lower() for m in pattern.finditer(source_text)}
+    if not found:
+        return []
+    translated_lower = translated_text.lower()
+    return sorted(term for term in found
+                  if not all(stem in translated_lower for stem in stems[term]))
+
+
+@lru_cache(maxsize=8)
+def _build_system_prompt(lang_tuple: tuple, has_glossary: bool,
+                         glossary_pairs: tuple[tuple[str, str], ...]) -> str:
+    lang_from, lang_to, _, _ = lang_tuple
 
     parts = []
     parts.append(f"Ты - профессиональный технический переводчик с {lang_from} на {lang_to}.")
@@ -831,15 +1153,15 @@ def build_system_prompt(lang_pair: str, glossary: list) -> str:
 Если в исходнике есть # заголовок - в переводе ДОЛЖЕН быть # заголовок.
 Если в исходнике есть **жирный** - в переводе ДОЛЖЕН быть **жирный**.""")
 
-    if TRANSLATE_SPEC.exists():
-        spec = TRANSLATE_SPEC.read_text(encoding="utf-8")
+    spec = _read_spec(TRANSLATE_SPEC)
+    if spec is not None:
         parts.append("=" * 60)
         parts.append("СПЕЦИФИКАЦИЯ ПЕРЕВОДА (TRANSLATE.md)")
         parts.append("=" * 60)
         parts.append(spec)
 
-    if HUMANIZER_SPEC.exists():
-        humanizer = HUMANIZER_SPEC.read_text(encoding="utf-8")
+    humanizer = _read_spec(HUMANIZER_SPEC)
+    if humanizer is not None:
         parts.append("\n" + "=" * 60)
         parts.append("РЕДАКТОРСКИЕ ПРАВИЛА (HUMANIZER.md) - только anti-AI cleanup")
         parts.append("ВАЖНО: НЕ применять секцию PERSONALITY AND SOUL.")
@@ -848,40 +1170,20 @@ def build_system_prompt(lang_pair: str, glossary: list) -> str:
         parts.append("=" * 60)
         parts.append(humanizer)
 
-    if glossary:
+    if has_glossary:
         parts.append("\n" + "=" * 60)
         parts.append("КАНОНИЧЕСКИЙ ГЛОССАРИЙ (glossary.json)")
         parts.append("Если term встречается в тексте - использовать ТОЛЬКО перевод из глоссария.")
         parts.append("=" * 60)
-        glossary_text = "\n".join(
-            f"- {e.get('term_en', e.get('term', ''))} -> {e.get('term_ru', e.get('translation', ''))}"
-            for e in glossary if isinstance(e, dict)
-        )
+        glossary_text = "\n".join(f"- {term} -> {translation}" for term, translation in glossary_pairs)
         parts.append(glossary_text)
 
     return "\n\n".join(parts)
 
 
-def build_user_prompt(source_text: str, filename: str, lang_pair: str,
-                      is_chunk: bool = False, chunk_num: int = 0,
-                      total_chunks: int = 0,
-                      translate_images: bool = False) -> str:
-    """Построить пользовательский промпт для перевода."""
-    lang_from, lang_to, lang_from_en, lang_to_en = LANGUAGES.get(lang_pair, LANGUAGES["en-ru"])
-
-    chunk_info = ""
-    if is_chunk:
-        chunk_info = f"\n\nЭто чанк {chunk_num}/{total_chunks}. Переводи только этот фрагмент."
-
-    image_rule = ("8. Изображения ![alt](path) - ПЕРЕВЕДИ alt-text, путь оставь без изменений."
-                  if translate_images else
-                  "8. Изображения ![alt](path) - оставь ПОЛНОСТЬЮ как есть, включая alt-text и путь.")
-
-    return f"""Переведи следующий документ с {lang_from} на {lang_to}.
-
-Файл: {filename}{chunk_info}
-
-ПРАВИЛА ФОРМАТИРОВАНИЯ (КРИТИЧЕСКИ ВАЖНО):
+# Правила в пользовательском промпте одинаковы для всех чанков: они
+# собираются один раз, а на каждый чанк форматируется только шапка
+_USER_PROMPT_RULES_HEAD = """ПРАВИЛА ФОРМАТИРОВАНИЯ (КРИТИЧЕСКИ ВАЖНО):
 
 1. MARKDOWN-РАЗМЕТКА: выход ОБЯЗАН содержать символы #, ##, ###, **, *, |, -, >, ``` - точно как в исходнике.
 2. ЗАГОЛОВКИ: ОБЯЗАТЕЛЬНО начинай с # (## для разделов, ### для подразделов). Каждый ровно ОДИН РАЗ, на ОДНОЙ строке.
@@ -891,7 +1193,9 @@ def build_user_prompt(source_text: str, filename: str, lang_pair: str,
 6. CODE BLOCKS: НЕ переводи содержимое ```. Оставь как есть.
 7. URL, идентификаторы: НЕ переводи.
 8. Глоссарий: используй канонические термины (если предоставлен).
-{image_rule}
+"""
+
+_USER_PROMPT_RULES_TAIL = """
 10. Иерархия уровней: # > ## > ### - сохрани как в исходнике.
 
 ПРИМЕР корректного вывода (EN->RU):
@@ -924,114 +1228,317 @@ This document describes **key concepts** of prompt engineering.
 
 ---НАЧАЛО ИСХОДНОГО ТЕКСТА---
 
-{source_text}
+"""
+
+_USER_PROMPT_RULES = {
+    False: (_USER_PROMPT_RULES_HEAD
+            + "8. Изображения ![alt](path) - оставь ПОЛНОСТЬЮ как есть, включая alt-text и путь."
+            + _USER_PROMPT_RULES_TAIL),
+    True: (_USER_PROMPT_RULES_HEAD
+           + "8. Изображения ![alt](path) - ПЕРЕВЕДИ alt-text, путь оставь без изменений."
+           + _USER_PROMPT_RULES_TAIL),
+}
+
+_USER_PROMPT_END = "\n\n---КОНЕЦ ИСХОДНОГО ТЕКСТА---"
+
 
----КОНЕЦ ИСХОДНОГО ТЕКСТА---"""
+def build_user_prompt(source_text: str, filename: str, lang_tuple: tuple,
+                      is_chunk: bool = False, chunk_num: int = 0,
+                      total_chunks: int = 0,
+                      translate_images: bool = False) -> str:
+    """Построить пользовательский промпт для перевода.
+
+    lang_tuple - запись LANGUAGES; выбирается один раз на документ.
+    """
+    lang_from, lang_to, _, _ = lang_tuple
+
+    chunk_info = ""
+    if is_chunk:
+        chunk_info = f"\n\nЭто чанк {chunk_num}/{total_chunks}. Переводи только этот фрагмент."
+
+    head = f"Переведи следующий документ с {lang_from} на {lang_to}.\n\nФайл: {filename}{chunk_info}\n\n"
+    return "".join((head, _USER_PROMPT_RULES[bool(translate_images)], source_text, _USER_PROMPT_END))
 
 
 def split_into_chunks(text: str, max_chars: int = CHUNK_SIZE_CHARS) -> list[str]:
-    """Разбить текст на чанки по заголовкам ##."""
+    """Разбить текст на чанки по заголовкам ##.
+
+    Секции (и абзацы слишком длинных секций) - это диапазоны [start, end)
+    исходного текста: текущий чанк растет сдвигом границы, без конкатенации
+    строк, а строка чанка вырезается один раз при выдаче.
+
+    main разбивает каждый текст один раз и передает чанки в прогноз и
+    перевод, поэтому результат здесь не кэшируется.
+    """
     if len(text) <= max_chars:
         return [text]
 
-    sections = re.split(r'(?=\n## )', text)
     chunks = []
-    current_chunk = ""
 
-    for section in sections:
-        if len(current_chunk) + len(section) <= max_chars:
-            current_chunk += section
-        else:
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-            if len(section) > max_chars:
-                paragraphs = section.split("\n\n")
-                current_chunk = ""
-                for para in paragraphs:
-                    if len(current_chunk) + len(para) + 2 <= max_chars:
-                        current_chunk += ("\n\n" if current_chunk else "") + para
-                    else:
-                        if current_chunk.strip():
-                            chunks.append(current_chunk.strip())
-                        current_chunk = para
-            else:
-                current_chunk = section
+    def flush(start: int, end: int):
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
 
-    if current_chunk.strip():
-        chunks.append(current_chunk.strip())
+    # Без заголовков ## текст - одна секция (ее все равно режем по абзацам)
+    if "\n## " in text:
+        bounds = [0] + [m.start() for m in _H2_SPLIT_RE.finditer(text)] + [len(text)]
+    else:
+        bounds = [0, len(text)]
+    # Текущий чанк - text[cur_start:cur_end]; пустой, когда границы совпадают
+    cur_start = cur_end = 0
+
+    for sec_start, sec_end in zip(bounds, bounds[1:]):
+        if (cur_end - cur_start) + (sec_end - sec_start) <= max_chars:
+            if cur_end == cur_start:
+                cur_start = sec_start
+            cur_end = sec_end
+            continue
+
+        flush(cur_start, cur_end)
+        if sec_end - sec_start <= max_chars:
+            cur_start, cur_end = sec_start, sec_end
+            continue
+
+        # Секция длиннее лимита - режем по абзацам (\n\n)
+        cur_start = cur_end = sec_start
+        pos = sec_start
+        while True:
+            sep = text.find("\n\n", pos, sec_end)
+            para_end = sec_end if sep < 0 else sep
+            if (cur_end - cur_start) + (para_end - pos) + 2 <= max_chars:
+                if cur_end == cur_start:
+                    cur_start = pos
+                cur_end = para_end
+            else:
+                flush(cur_start, cur_end)
+                cur_start, cur_end = pos, para_end
+            if sep < 0:
+                break
+            pos = sep + 2
 
+    flush(cur_start, cur_end)
     return chunks if chunks else [text]
 
 
+@dataclass(slots=True)
+class FileStats:
+    """Результат перевода одного файла (translate_document)."""
+    file: str
+    source_chars: int
+    chunks: int
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    status: str = "ok"
+    translated_text: str = ""
+
+
+class TranslationInterrupted(Exception):
+    """Перевод прерван пользователем (Ctrl+C) во время ответа API."""
+
+
+def _seconds_until(reset: str | None) -> float:
+    """Секунды до момента сброса лимита (RFC 3339 из заголовка *-reset)."""
+    if not reset:
+        return 0.0
+    try:
+        # fromisoformat в Python 3.10 не понимает суффикс "Z"
+        at = datetime.fromisoformat(reset.replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if at.tzinfo is None:
+        return 0.0
+    return max(0.0, (at - datetime.now(at.tzinfo)).total_seconds())
+
+
+class RequestThrottle:
+    """Ограничение частоты запросов к API: не больше rpm в минуту.
+
+    Потокобезопасно: каждый вызов wait() занимает следующий свободный
+    слот и спит до него. rpm=0/None - без ограничения по rpm.
+
+    Кроме того, observe() читает заголовки anthropic-ratelimit-* ответа:
+    пока квота не на исходе, пауз нет; когда запросы (или выходные токены)
+    почти кончились, следующий слот сдвигается на момент сброса лимита.
+
+    Кэш системного промпта: первый запрос запуска уходит один, остальные
+    ждут в wait(), пока он не начнет получать ответ (cache_ready()) - к
+    этому моменту промпт уже записан в кэш, и параллельные запросы читают
+    его по цене чтения, а не платят каждый за запись.
+    """
+
+    def __init__(self, rpm: int | None):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._cache_leader_taken = False
+        self._cache_warm = threading.Event()
+
+    def cache_ready(self) -> None:
+        """Первый запрос получил ответ (или завершился) - пропустить остальные."""
+        self._cache_warm.set()
+
+    def observe(self, headers) -> None:
+        """Учесть заголовки лимитов из ответа API (если они есть)."""
+        if not headers:
+            return
+        delay = 0.0
+        for kind, low in (("requests", 1), ("output-tokens", MAX_OUTPUT_TOKENS)):
+            remaining = headers.get(f"anthropic-ratelimit-{kind}-remaining")
+            if remaining is None:
+                continue
+            try:
+                if int(remaining) >= low:
+                    continue
+            except ValueError:
+                continue
+            delay = max(delay, _seconds_until(headers.get(f"anthropic-ratelimit-{kind}-reset")))
+        if delay > 0:
+            with self._lock:
+                self._next_slot = max(self._next_slot, time.monotonic() + delay)
+
+    def wait(self) -> bool:
+        """Дождаться своего слота. True - это первый запрос запуска: вызывающий
+        обязан вызвать cache_ready(), когда пойдет ответ."""
+        leader = False
+        if not self._cache_warm.is_set():
+            with self._lock:
+                leader = not self._cache_leader_taken
+                self._cache_leader_taken = True
+            if not leader:
+                self._cache_warm.wait()
+        if not self.interval and self._next_slot <= time.monotonic():
+            return leader
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+        return leader
+
+
 def translate_text(client, model: str, system_prompt: str,
-                   source_text: str, filename: str, lang_pair: str,
+                   source_text: str, filename: str, lang_tuple: tuple,
                    is_chunk: bool = False, chunk_num: int = 0,
                    total_chunks: int = 0,
-                   translate_images: bool = False) -> tuple[str, int, int]:
-    """Перевести текст через Claude API."""
-    user_prompt = build_user_prompt(source_text, filename, lang_pair,
+                   translate_images: bool = False,
+                   throttle: RequestThrottle = None) -> tuple[str, int, int, float]:
+    """Перевести текст через Claude API.
+
+    Возвращает (перевод, входные токены, выходные токены, стоимость).
+    Системный промпт помечен для кэширования: он одинаков для всех чанков
+    и файлов запуска, поэтому после первого запроса читается из кэша.
+    Во входные токены включены и кэшированные.
+    """
+    user_prompt = build_user_prompt(source_text, filename, lang_tuple,
                                     is_chunk, chunk_num, total_chunks,
                                     translate_images)
 
-    response = client.messages.create(
-        model=model,
-        max_tokens=MAX_OUTPUT_TOKENS,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_prompt}],
-    )
+    # Первый запрос запуска (cache_leader) пишет системный промпт в кэш;
+    # остальные стоят в throttle.wait(), пока у него не пойдет текст ответа
+    cache_leader = throttle.wait() if throttle is not None else False
 
-    translated = response.content[0].text
-    return translated, response.usage.input_tokens, response.usage.output_tokens
+    # Потоковый ответ: текст принимается по мере генерации, а Ctrl+C
+    # прерывает запрос посреди чанка, не дожидаясь конца ответа
+    parts = []
+    try:
+        with client.messages.stream(
+            model=model,
+            max_tokens=MAX_OUTPUT_TOKENS,
+            system=[{"type": "text", "text": system_prompt,
+                     "cache_control": {"type": "ephemeral"}}],
+            messages=[{"role": "user", "content": user_prompt}],
+        ) as stream:
+            for text in stream.text_stream:
+                if cache_leader:
+                    throttle.cache_ready()
+                    cache_leader = False
+                if _interrupted:
+                    raise TranslationInterrupted(filename)
+                parts.append(text)
+            final = stream.get_final_message()
+            if throttle is not None:
+                # Пауза только при исчерпании квоты - по заголовкам лимитов ответа
+                throttle.observe(getattr(getattr(stream, "response", None), "headers", None))
+    finally:
+        # Ошибка или пустой ответ первого запроса не должны держать остальных
+        if cache_leader:
+            throttle.cache_ready()
+
+    usage = final.usage
+    input_tokens = (usage.input_tokens
+                    + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+                    + (getattr(usage, "cache_read_input_tokens", 0) or 0))
+    return "".join(parts), input_tokens, usage.output_tokens, calc_usage_cost(usage)
 
 
 def translate_document(client, model: str, system_prompt: str,
                        source_text: str, filename: str, lang_pair: str,
-                       translate_images: bool = False) -> dict:
-    """Перевести один документ (с разбивкой на чанки)."""
-    chunks = split_into_chunks(source_text)
-
-    stats = {
-        "file": filename,
-        "source_chars": len(source_text),
-        "chunks": len(chunks),
-        "input_tokens": 0,
-        "output_tokens": 0,
-        "cost": 0.0,
-        "status": "ok",
-        "translated_text": "",
-    }
+                       translate_images: bool = False,
+                       executor: ThreadPoolExecutor = None,
+                       throttle: RequestThrottle = None,
+                       chunks: list[str] = None) -> FileStats:
+    """Перевести один документ (с разбивкой на чанки).
+
+    С executor чанки переводятся параллельно (запросы к API - это ожидание
+    сети, GIL не мешает); порядок частей в результате сохраняется.
+    chunks - готовая разбивка source_text (иначе текст разбивается здесь).
+    """
+    lang_tuple = LANGUAGES.get(lang_pair, LANGUAGES["en-ru"])
+    if chunks is None:
+        chunks = split_into_chunks(source_text)
+
+    stats = FileStats(file=filename, source_chars=len(source_text), chunks=len(chunks))
 
     translated_parts = []
+    is_chunked = len(chunks) > 1
 
-    for i, chunk in enumerate(chunks, 1):
+    def run_chunk(i: int, chunk: str):
         if _interrupted:
-            stats["status"] = "interrupted"
-            return stats
-
-        is_chunked = len(chunks) > 1
+            return None
         if is_chunked:
-            log(f"    Чанк {i}/{len(chunks)} ({len(chunk):,} символов)...")
+            log(f"    {filename}: чанк {i}/{len(chunks)} ({len(chunk):,} символов)...")
+        return translate_text(
+            client, model, system_prompt,
+            chunk, filename, lang_tuple,
+            is_chunk=is_chunked, chunk_num=i, total_chunks=len(chunks),
+            translate_images=translate_images, throttle=throttle,
+        )
 
+    futures = []
+    if executor is None:
+        results = [partial(run_chunk, i, chunk) for i, chunk in enumerate(chunks, 1)]
+    else:
+        futures = [executor.submit(run_chunk, i, chunk) for i, chunk in enumerate(chunks, 1)]
+        results = [fut.result for fut in futures]
+
+    for get_result in results:
         try:
-            translation, inp_tok, out_tok = translate_text(
-                client, model, system_prompt,
-                chunk, filename, lang_pair,
-                is_chunk=is_chunked, chunk_num=i, total_chunks=len(chunks),
-                translate_images=translate_images
-            )
-            translated_parts.append(translation)
-            stats["input_tokens"] += inp_tok
-            stats["output_tokens"] += out_tok
+            result = get_result()
+        except TranslationInterrupted:
+            result = None
         except Exception as e:
+            for fut in futures:
+                fut.cancel()
             log(f"    ОШИБКА: {e}", "ERROR")
-            stats["status"] = f"error: {e}"
+            stats.status = f"error: {e}"
             return stats
 
-        if is_chunked and i < len(chunks):
-            time.sleep(1)
+        if result is None:
+            for fut in futures:
+                fut.cancel()
+            stats.status = "interrupted"
+            return stats
+
+        translation, inp_tok, out_tok, cost = result
+        translated_parts.append(translation)
+        stats.input_tokens += inp_tok
+        stats.output_tokens += out_tok
+        stats.cost += cost
 
-    stats["translated_text"] = "\n\n".join(translated_parts)
-    stats["cost"] = calc_cost(stats["input_tokens"], stats["output_tokens"])
+    stats.translated_text = "\n\n".join(translated_parts)
     return stats
 
 
@@ -1052,11 +1559,38 @@ ATTRIBUTION = {
 }
 
 
+def _iter_lines(text: str):
+    """Строки текста по одной - как text.split('\\n'), но без списка всех строк."""
+    for line in io.StringIO(text):
+        yield line.rstrip('\n')
+    if not text or text.endswith('\n'):
+        yield ''
+
+
+def _heading_level(stripped: str) -> int:
+    """Уровень заголовка "#..# текст" (1-6) или 0 - без регулярного выражения."""
+    if stripped[:1] != '#':
+        return 0
+    level = len(stripped) - len(stripped.lstrip('#'))
+    if level <= 6 and stripped[level:level + 1].isspace():
+        return level
+    return 0
+
+
 def dedup_lines(text: str) -> str:
     """Remove consecutive duplicate lines, split headings, and orphaned fragments."""
-    lines = text.split('\n')
-    result = []
+    return '\n'.join(_dedup_line_iter(_iter_lines(text)))
+
+
+def _dedup_line_iter(lines):
+    """Kept lines of dedup_lines, produced lazily from an iterable of lines.
+
+    Single pass: the last kept line is held back in `pending` because a
+    fuller heading on the next line may still replace it.
+    """
+    pending = None  # last kept line, not yet yielded
     prev_stripped = None
+    prev_level = 0  # уровень заголовка prev_stripped (0 - не заголовок)
     skip_next_if_fragment = None  # text fragment to skip if found on next line
 
     for line in lines:
@@ -1073,19 +1607,17 @@ def dedup_lines(text: str) -> str:
         skip_next_if_fragment = None
 
         # Handle consecutive heading lines: keep longer, mark fragment for skip
-        if (prev_stripped and stripped
-            and re.match(r'^#{1,6}\s', prev_stripped)
-            and re.match(r'^#{1,6}\s', stripped)):
-            prev_level = re.match(r'^(#{1,6})\s', prev_stripped).group(1)
-            curr_level = re.match(r'^(#{1,6})\s', stripped).group(1)
-            prev_text = re.sub(r'^#{1,6}\s+', '', prev_stripped)
-            curr_text = re.sub(r'^#{1,6}\s+', '', stripped)
+        curr_level = _heading_level(stripped)
+        if curr_level and prev_level:
+            prev_text = prev_stripped[prev_level:].lstrip()
+            curr_text = stripped[curr_level:].lstrip()
 
             if prev_level == curr_level:
                 if prev_text in curr_text:
                     # Current is fuller version - replace previous
-                    result[-1] = line
+                    pending = line
                     prev_stripped = stripped
+                    prev_level = curr_level
                     continue
                 elif curr_text in prev_text:
                     # Previous is already fuller - skip this and mark fragment
@@ -1094,10 +1626,14 @@ def dedup_lines(text: str) -> str:
                         skip_next_if_fragment = remainder
                     continue
 
-        result.append(line)
+        if pending is not None:
+            yield pending
+        pending = line
         prev_stripped = stripped
+        prev_level = curr_level
 
-    return '\n'.join(result)
+    if pending is not None:
+        yield pending
 
 
 def get_target_lang_code(lang_pair: str) -> str:
@@ -1107,119 +1643,117 @@ def get_target_lang_code(lang_pair: str) -> str:
 
 def cleanup_markdown(text: str) -> str:
     """Clean up translated markdown: fix line breaks, tables, headings."""
-    lines = text.split('\n')
-    result = []
+    return _cleanup_line_iter(_iter_lines(text))
+
+
+def _cleanup_line_iter(lines) -> str:
+    """cleanup_markdown over an iterable of lines (e.g. from _dedup_line_iter).
+
+    Single pass: lines are read lazily (no list of all lines) and written
+    to a StringIO. An open paragraph is collected in `para` and flushed
+    as one line when a blank line or another block starts.
+    """
+    out = io.StringIO()
     in_code = False
     in_table = False
-    prev_blank = False
+    para = []  # строки текущего абзаца (уже strip), еще не записанные
+    # Что записано последним: 'start' (ничего), 'blank' (пустая строка-
+    # разделитель) или 'content'
+    last = 'start'
+
+    def emit(s: str):
+        nonlocal last
+        out.write(s)
+        out.write('\n')
+        last = 'content'
+
+    def emit_blank():
+        nonlocal last
+        if last == 'content':
+            out.write('\n')
+            last = 'blank'
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
+    for line in lines:
+        stripped = line.strip()
+
+        # Continue an open paragraph until a blank line, heading, list,
+        # table, code, blockquote, hr or image
+        if para:
+            if stripped and not (
+                    (stripped[0] in _BLOCK_START_CHARS or stripped[0].isdigit())
+                    and (_BLOCK_BREAK_RE.match(stripped) or _LIST_ITEM_RE.match(line))):
+                para.append(stripped)
+                continue
+            # Join paragraph into single line
+            emit(' '.join(para))
+            para = []
 
         # Toggle code block state
-        if line.strip().startswith('```'):
+        if stripped.startswith('```'):
             in_code = not in_code
-            result.append(line)
-            prev_blank = False
-            i += 1
+            emit(line)
             continue
 
         # Inside code block - keep as is
         if in_code:
-            result.append(line)
-            prev_blank = False
-            i += 1
+            emit(line)
             continue
 
-        stripped = line.strip()
-
         # Blank line handling - max one between content
         if not stripped:
-            if not prev_blank and result:
-                result.append('')
-                prev_blank = True
-            i += 1
+            emit_blank()
             continue
 
-        prev_blank = False
+        # Тип блока определяется по первому символу; регулярные выражения
+        # проверяются только для подходящего символа
+        c0 = stripped[0]
 
         # Table lines - keep intact, ensure table continuity
-        if stripped.startswith('|') and stripped.endswith('|'):
-            if not in_table and result and result[-1] != '':
-                result.append('')
+        if c0 == '|' and stripped.endswith('|'):
+            if not in_table:
+                emit_blank()
             in_table = True
-            result.append(line)
-            i += 1
+            emit(line)
             continue
         else:
             if in_table:
                 in_table = False
-                # Don't add blank line if next content will add its own
-                if result and result[-1] != '':
-                    result.append('')
+                emit_blank()
 
         # Heading - must be single line, ensure blank line before
-        if re.match(r'^#{1,6}\s', stripped):
-            if result and result[-1] != '':
-                result.append('')
-            result.append(line)
-            i += 1
+        if c0 == '#' and _HEADING_RE.match(stripped):
+            emit_blank()
+            emit(line)
             continue
 
         # Horizontal rules
-        if stripped in ('---', '***', '___'):
-            result.append(line)
-            i += 1
+        if c0 in '-*_' and stripped in ('---', '***', '___'):
+            emit(line)
             continue
 
         # List items - keep as separate lines
-        if re.match(r'^(\s*)([-*+]|\d+\.)\s+', line):
-            result.append(line)
-            i += 1
+        if (c0 in '-*+' or c0.isdigit()) and _LIST_ITEM_RE.match(line):
+            emit(line)
             continue
 
         # Blockquote
-        if stripped.startswith('>'):
-            result.append(line)
-            i += 1
+        if c0 == '>':
+            emit(line)
             continue
 
         # Image reference
-        if re.match(r'^!\[', stripped):
-            result.append(line)
-            i += 1
+        if c0 == '!' and stripped.startswith('!['):
+            emit(line)
             continue
 
-        # Regular paragraph text - join consecutive non-special lines
-        para_lines = [stripped]
-        j = i + 1
-        while j < len(lines):
-            next_stripped = lines[j].strip()
-            # Stop joining at: blank line, heading, list, table, code, blockquote, hr, image
-            if (not next_stripped
-                or re.match(r'^#{1,6}\s', next_stripped)
-                or re.match(r'^(\s*)([-*+]|\d+\.)\s+', lines[j])
-                or (next_stripped.startswith('|') and next_stripped.endswith('|'))
-                or next_stripped.startswith('```')
-                or next_stripped.startswith('>')
-                or next_stripped in ('---', '***', '___')
-                or re.match(r'^!\[', next_stripped)):
-                break
-            para_lines.append(next_stripped)
-            j += 1
+        # Regular paragraph text - joined with the following lines
+        para.append(stripped)
 
-        # Join paragraph into single line
-        paragraph = ' '.join(para_lines)
-        result.append(paragraph)
-        i = j
-        continue
+    if para:
+        emit(' '.join(para))
 
     # Final cleanup: remove trailing blank lines
-    while result and result[-1] == '':
-        result.pop()
-
-    return '\n'.join(result) + '\n'
+    return out.getvalue().rstrip('\n') + '\n'
 
 
 def validate_markdown(source: str, translated: str, filename: str) -> list[str]:
@@ -1300,13 +1834,13 @@ def repair_markdown(source: str, translated: str) -> str:
             if not stripped:
                 continue
             # Already a heading - skip
-            if re.match(r'^#{1,6}\s', stripped):
+            if _HEADING_RE.match(stripped):
                 continue
             # Skip formatted lines
             if stripped.startswith(('|', '>', '!', '`', '```')):
                 continue
             # Skip list items
-            if re.match(r'^(\s*)([-*+]|\d+\.)\s', line):
+            if _LIST_ITEM_RE.match(line):
                 continue
 
             # HARD REJECT: headings NEVER end with sentence punctuation
@@ -1365,7 +1899,7 @@ def repair_markdown(source: str, translated: str) -> str:
         if repairs:
             for idx, level in repairs.items():
                 stripped = tr_lines[idx].strip()
-                if not re.match(r'^#{1,6}\s', stripped):
+                if not _HEADING_RE.match(stripped):
                     tr_lines[idx] = '#' * level + ' ' + stripped
 
             translated = '\n'.join(tr_lines)
@@ -1432,7 +1966,7 @@ def repair_markdown(source: str, translated: str) -> str:
     return translated
 
 
-def assemble_document(translations: list[dict], title: str = "",
+def assemble_document(translations: list[FileStats], title: str = "",
                       lang_pair: str = "en-ru") -> str:
     """Собрать все переводы в один Markdown-документ."""
     target_lang = get_target_lang_code(lang_pair)
@@ -1446,192 +1980,311 @@ def assemble_document(translations: list[dict], title: str = "",
     for i, tr in enumerate(translations):
         if len(translations) > 1 and i > 0:
             parts.append(f"\n---\n")
-        parts.append(tr["translated_text"])
+        parts.append(tr.translated_text)
 
-    assembled = "\n\n".join(parts)
+    # Части не склеиваются в одну строку: строки "\n\n".join(parts) идут
+    # потоком через dedup (повторы заголовков/строк) в cleanup, и в памяти
+    # собирается только итоговый документ
+    return _cleanup_line_iter(_dedup_line_iter(_iter_joined_lines(parts)))
 
-    # Deduplicate consecutive identical headings/lines
-    assembled = dedup_lines(assembled)
 
-    # Clean up markdown formatting
-    assembled = cleanup_markdown(assembled)
-
-    return assembled
+def _iter_joined_lines(parts: list[str]):
+    """Строки "\n\n".join(parts) без построения самой строки."""
+    for i, part in enumerate(parts):
+        if i:
+            yield ''
+        yield from _iter_lines(part)
 
 
 # ---------------------------------------------------------------------------
 # STEP 4: Output - генерация всех форматов
 # ---------------------------------------------------------------------------
 
-def generate_html(md_text: str, title: str, lang_pair: str = "en-ru") -> str:
-    """Markdown -> HTML with proper formatting."""
-    import markdown
-    extensions = [
-        'markdown.extensions.tables',
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.toc',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.nl2br',
-        'markdown.extensions.smarty',
-    ]
-    html_content = markdown.markdown(md_text, extensions=extensions)
-    date_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-    target_lang = get_target_lang_code(lang_pair)
-
-    # Map short code to HTML lang attribute
-    lang_html = {
-        "ru": "ru", "en": "en", "de": "de", "es": "es",
-        "fr": "fr", "zh": "zh", "ja": "ja", "pt": "pt",
-    }.get(target_lang, "en")
-
-    return f"""<!DOCTYPE html>
-<html lang="{lang_html}">
+# HTML-шаблон для generate_html: CSS не меняется от документа к документу,
+# поэтому шаблон режется на части один раз при импорте, а не собирается
+# f-строкой на каждый файл
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="{lang}">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{title}</title>
     <style>
-        * {{ box-sizing: border-box; }}
-        body {{
+        * { box-sizing: border-box; }
+        body {
             font-family: 'Segoe UI', 'DejaVu Sans', 'Helvetica Neue', Arial, sans-serif;
             line-height: 1.75; color: #1a1a2e; background: #fafbfc;
             max-width: 860px; margin: 0 auto; padding: 40px 32px;
             word-wrap: break-word; overflow-wrap: break-word;
-        }}
-        p {{
+        }
+        p {
             margin: 0 0 1em 0;
             text-align: justify;
             hyphens: auto;
             -webkit-hyphens: auto;
             -ms-hyphens: auto;
-        }}
-        h1 {{
+        }
+        h1 {
             font-size: 2em; font-weight: 700;
             border-bottom: 3px solid #4361ee;
             padding-bottom: 12px; margin: 40px 0 20px 0;
             line-height: 1.3;
-        }}
-        h2 {{
+        }
+        h2 {
             font-size: 1.5em; font-weight: 700;
             border-bottom: 1px solid #dee2e6;
             padding-bottom: 8px; margin: 36px 0 16px 0;
             line-height: 1.3;
-        }}
-        h3 {{ font-size: 1.25em; font-weight: 700; margin: 28px 0 12px 0; line-height: 1.3; }}
-        h4 {{ font-size: 1.1em; font-weight: 700; margin: 24px 0 10px 0; }}
-        a {{ color: #4361ee; text-decoration: none; }}
-        a:hover {{ text-decoration: underline; }}
-        code {{
+        }
+        h3 { font-size: 1.25em; font-weight: 700; margin: 28px 0 12px 0; line-height: 1.3; }
+        h4 { font-size: 1.1em; font-weight: 700; margin: 24px 0 10px 0; }
+        a { color: #4361ee; text-decoration: none; }
+        a:hover { text-decoration: underline; }
+        code {
             background: #e9ecef; padding: 2px 6px; border-radius: 4px;
             font-family: 'Consolas', 'Courier New', monospace;
             font-size: 0.9em; color: #d63384;
             word-break: break-all;
-        }}
-        pre {{
+        }
+        pre {
             background: #1e1e2e; color: #cdd6f4; padding: 20px;
             border-radius: 8px; overflow-x: auto; line-height: 1.5;
             margin: 16px 0; white-space: pre-wrap; word-wrap: break-word;
-        }}
-        pre code {{ background: none; color: inherit; padding: 0; word-break: normal; }}
-        ul, ol {{ padding-left: 28px; margin: 8px 0 16px 0; }}
-        li {{ margin: 4px 0; line-height: 1.6; }}
-        table {{ border-collapse: collapse; width: 100%; margin: 16px 0; }}
-        th, td {{ border: 1px solid #dee2e6; padding: 10px 14px; text-align: left; }}
-        th {{ background: #f1f3f5; font-weight: 600; }}
-        tr:nth-child(even) {{ background: #f8f9fa; }}
-        blockquote {{
+        }
+        pre code { background: none; color: inherit; padding: 0; word-break: normal; }
+        ul, ol { padding-left: 28px; margin: 8px 0 16px 0; }
+        li { margin: 4px 0; line-height: 1.6; }
+        table { border-collapse: collapse; width: 100%; margin: 16px 0; }
+        th, td { border: 1px solid #dee2e6; padding: 10px 14px; text-align: left; }
+        th { background: #f1f3f5; font-weight: 600; }
+        tr:nth-child(even) { background: #f8f9fa; }
+        blockquote {
             border-left: 4px solid #4361ee; margin: 16px 0;
             padding: 12px 20px; background: #eef2ff;
             color: #495057; font-style: italic;
-        }}
-        blockquote p {{ margin: 0 0 0.5em 0; }}
-        blockquote p:last-child {{ margin: 0; }}
-        img {{ max-width: 100%; height: auto; margin: 16px 0; display: block; }}
-        hr {{ border: none; border-top: 2px solid #dee2e6; margin: 32px 0; }}
-        .meta {{
+        }
+        blockquote p { margin: 0 0 0.5em 0; }
+        blockquote p:last-child { margin: 0; }
+        img { max-width: 100%; height: auto; margin: 16px 0; display: block; }
+        hr { border: none; border-top: 2px solid #dee2e6; margin: 32px 0; }
+        .meta {
             color: #868e96; font-size: 0.85em;
             border-top: 1px solid #dee2e6;
             padding-top: 16px; margin-top: 48px;
-        }}
-        @media print {{
-            body {{ max-width: none; padding: 20px; }}
-            pre {{ white-space: pre-wrap; }}
-            a {{ color: #1a1a2e; text-decoration: underline; }}
-        }}
-        @media (max-width: 640px) {{
-            body {{ padding: 16px; }}
-            h1 {{ font-size: 1.6em; }}
-            h2 {{ font-size: 1.3em; }}
-            table {{ font-size: 0.9em; }}
-            th, td {{ padding: 6px 8px; }}
-        }}
+        }
+        @media print {
+            body { max-width: none; padding: 20px; }
+            pre { white-space: pre-wrap; }
+            a { color: #1a1a2e; text-decoration: underline; }
+        }
+        @media (max-width: 640px) {
+            body { padding: 16px; }
+            h1 { font-size: 1.6em; }
+            h2 { font-size: 1.3em; }
+            table { font-size: 0.9em; }
+            th, td { padding: 6px 8px; }
+        }
     </style>
 </head>
 <body>
-{html_content}
-<div class="meta">md-translate-ru | {date_str}</div>
+{content}
+<div class="meta">md-translate-ru | {date}</div>
 </body>
 </html>"""
 
 
-def generate_pdf(md_text: str, output_path: Path, title: str):
-    """Markdown -> PDF через fpdf2 с кириллицей."""
-    from fpdf import FPDF
+def _split_html_template(template: str) -> tuple[str, str, str, str, str]:
+    """Разрезать шаблон по {lang}/{title}/{content}/{date}.
 
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=20)
+    Шаблон не проходит через str.format, поэтому фигурные скобки CSS в нем
+    не экранируются.
+    """
+    preamble, rest = template.split("{lang}", 1)
+    mid1, rest = rest.split("{title}", 1)
+    mid2, rest = rest.split("{content}", 1)
+    mid3, tail = rest.split("{date}", 1)
+    return preamble, mid1, mid2, mid3, tail
 
-    # Регистрация шрифтов
-    font_map = {
-        "DejaVuSans": {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf",
-                        "I": "DejaVuSans-Oblique.ttf", "BI": "DejaVuSans-BoldOblique.ttf"},
-        "DejaVuMono": {"": "DejaVuSansMono.ttf", "B": "DejaVuSansMono-Bold.ttf"},
-    }
-    for family, styles in font_map.items():
-        for style, filename in styles.items():
-            font_path = FONT_DIR / filename
-            if font_path.exists():
-                pdf.add_font(family, style, str(font_path))
 
-    pdf.add_page()
-    pdf.set_font("DejaVuSans", size=10)
+_HTML_PREAMBLE, _HTML_MID1, _HTML_MID2, _HTML_MID3, _HTML_TAIL = _split_html_template(HTML_TEMPLATE)
 
-    def clean(text):
-        text = re.sub(r'\*\*\*(.+?)\*\*\*', r'\1', text)
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        text = re.sub(r'`(.+?)`', r'\1', text)
-        text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)
-        text = re.sub(r'!\[(.+?)\]\(.+?\)', r'[\1]', text)
-        return text
 
-    lines = md_text.split('\n')
-    in_code = False
-    code_buf = []
+_MD = None
 
-    for line in lines:
-        if line.strip().startswith('```'):
-            if in_code:
-                pdf.set_fill_color(30, 30, 46)
-                pdf.set_text_color(205, 214, 244)
-                pdf.set_font("DejaVuMono", size=8)
-                for cl in code_buf:
-                    t = cl[:95] + "..." if len(cl) > 95 else cl
-                    pdf.cell(0, 4.5, t)
-                    pdf.ln(4.5)
-                pdf.set_font("DejaVuSans", size=10)
-                pdf.set_text_color(30, 30, 30)
-                pdf.ln(4)
+
+def _get_md():
+    """Markdown-конвертер с расширениями - создаётся один раз на процесс."""
+    global _MD
+    if _MD is None:
+        import markdown
+        extensions = [
+            'markdown.extensions.tables',
+            'markdown.extensions.fenced_code',
+            'markdown.extensions.toc',
+            'markdown.extensions.sane_lists',
+            'markdown.extensions.nl2br',
+            'markdown.extensions.smarty',
+        ]
+        _MD = markdown.Markdown(extensions=extensions)
+    return _MD
+
+
+def generate_html(md_text: str, title: str, lang_pair: str = "en-ru") -> str:
+    """Markdown -> HTML with proper formatting."""
+    # reset() сбрасывает состояние прошлого документа (toc, сноски)
+    html_content = _get_md().reset().convert(md_text)
+    target_lang = get_target_lang_code(lang_pair)
+
+    # Map short code to HTML lang attribute
+    lang_html = {
+        "ru": "ru", "en": "en", "de": "de", "es": "es",
+        "fr": "fr", "zh": "zh", "ja": "ja", "pt": "pt",
+    }.get(target_lang, "en")
+
+    date_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    return "".join((
+        _HTML_PREAMBLE, lang_html, _HTML_MID1, title, _HTML_MID2,
+        html_content, _HTML_MID3, date_str, _HTML_TAIL,
+    ))
+
+
+def _inline_md_sub(m: re.Match) -> str:
+    if m.group(1) is not None:
+        return f'[{m.group(1)}]'
+    if m.group(6) is not None:
+        return m.group(6)
+    # Внутри **...** или ссылки может быть еще разметка: **жирный `код`**
+    inner = m.group(2) or m.group(3) or m.group(4) or m.group(5)
+    if '*' in inner or '`' in inner or '[' in inner:
+        return _INLINE_MD_RE.sub(_inline_md_sub, inner)
+    return inner
+
+
+def strip_inline_markdown(text: str) -> str:
+    """Снять строчную разметку (**, *, `, ссылки) для PDF/DOCX.
+
+    Один проход регулярного выражения вместо шести последовательных
+    re.sub; картинки ![alt](path) превращаются в [alt].
+    """
+    return _INLINE_MD_RE.sub(_inline_md_sub, text)
+
+
+def parse_md_blocks(md_text: str) -> list[tuple[str, object]]:
+    """Разбить Markdown на блоки для генераторов PDF/DOCX - один раз на документ.
+
+    ("code", [строки]) - закрытый блок ``` (незакрытый отбрасывается, как и
+    раньше в обоих генераторах); ("table", [строки]) - подряд идущие строки
+    таблицы |...|; ("line", строка) - все остальные строки, включая пустые.
+    """
+    blocks = []
+    code_buf = None  # не None - внутри блока кода
+    table_buf = []
+
+    for line in _iter_lines(md_text):
+        stripped = line.strip()
+        if stripped.startswith('```'):
+            if table_buf:
+                blocks.append(("table", table_buf))
+                table_buf = []
+            if code_buf is None:
                 code_buf = []
-                in_code = False
             else:
-                in_code = True
+                blocks.append(("code", code_buf))
+                code_buf = None
             continue
 
-        if in_code:
+        if code_buf is not None:
             code_buf.append(line)
             continue
 
+        if stripped.startswith('|') and stripped.endswith('|'):
+            table_buf.append(line)
+            continue
+        if table_buf:
+            blocks.append(("table", table_buf))
+            table_buf = []
+        blocks.append(("line", line))
+
+    if table_buf:
+        blocks.append(("table", table_buf))
+    return blocks
+
+
+PDF_FONT_MAP = {
+    "DejaVuSans": {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf",
+                   "I": "DejaVuSans-Oblique.ttf", "BI": "DejaVuSans-BoldOblique.ttf"},
+    "DejaVuMono": {"": "DejaVuSansMono.ttf", "B": "DejaVuSansMono-Bold.ttf"},
+}
+
+
+@lru_cache(maxsize=1)
+def _pdf_fonts() -> tuple[tuple[str, str, str], ...]:
+    """(семейство, стиль, путь) для найденных шрифтов - поиск один раз на процесс."""
+    return tuple(
+        (family, style, str(FONT_DIR / filename))
+        for family, styles in PDF_FONT_MAP.items()
+        for style, filename in styles.items()
+        if (FONT_DIR / filename).exists()
+    )
+
+
+def generate_pdf(md_text: str, output_path: Path, title: str,
+                 blocks: list = None):
+    """Markdown -> PDF через fpdf2 с кириллицей.
+
+    blocks - результат parse_md_blocks(md_text), если он уже есть.
+    """
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=20)
+
+    # Регистрация шрифтов. Сами TTF fpdf2 разбирает для каждого документа
+    # заново: в шрифте хранится набор использованных глифов этого PDF
+    for family, style, font_path in _pdf_fonts():
+        pdf.add_font(family, style, font_path)
+
+    pdf.add_page()
+    pdf.set_font("DejaVuSans", size=10)
+
+    clean = strip_inline_markdown
+
+    if blocks is None:
+        blocks = parse_md_blocks(md_text)
+
+    for kind, block in blocks:
+        if kind == "code":
+            pdf.set_fill_color(30, 30, 46)
+            pdf.set_text_color(205, 214, 244)
+            pdf.set_font("DejaVuMono", size=8)
+            if block:
+                # Весь блок - одним multi_cell: переводы строк он обрабатывает сам
+                pdf.multi_cell(0, 4.5, "\n".join(
+                    cl[:95] + "..." if len(cl) > 95 else cl for cl in block
+                ))
+                pdf.set_x(pdf.l_margin)
+            pdf.set_font("DejaVuSans", size=10)
+            pdf.set_text_color(30, 30, 30)
+            pdf.ln(4)
+            continue
+
+        if kind == "table":
+            pdf.set_font("DejaVuSans", size=9)
+            for row_line in block:
+                stripped = row_line.strip()
+                if _TABLE_SEP_RE.match(stripped):
+                    continue
+                cells = [c.strip() for c in stripped.split('|')[1:-1]]
+                n = len(cells) or 1
+                w = pdf.epw / n
+                for c in cells:
+                    t = clean(c)[:40]
+                    pdf.cell(w, 7, t, border=1)
+                pdf.ln()
+            pdf.set_font("DejaVuSans", size=10)
+            continue
+
+        line = block
         stripped = line.strip()
 
         if not stripped:
@@ -1661,21 +2314,7 @@ def generate_pdf(md_text: str, output_path: Path, title: str):
             pdf.ln(8)
             continue
 
-        if stripped.startswith('|') and stripped.endswith('|'):
-            if re.match(r'^\|[\s\-:|]+\|$', stripped):
-                continue
-            cells = [c.strip() for c in stripped.split('|')[1:-1]]
-            n = len(cells) or 1
-            w = pdf.epw / n
-            pdf.set_font("DejaVuSans", size=9)
-            for c in cells:
-                t = clean(c)[:40]
-                pdf.cell(w, 7, t, border=1)
-            pdf.ln()
-            pdf.set_font("DejaVuSans", size=10)
-            continue
-
-        list_m = re.match(r'^(\s*)([-*+]|\d+\.)\s+(.+)', line)
+        list_m = _LIST_ITEM_TEXT_RE.match(line)
         if list_m:
             indent = len(list_m.group(1))
             offset = 10 + (indent // 2) * 6
@@ -1703,8 +2342,12 @@ def generate_pdf(md_text: str, output_path: Path, title: str):
     pdf.output(str(output_path))
 
 
-def generate_docx(md_text: str, output_path: Path, title: str):
-    """Markdown -> DOCX через python-docx."""
+def generate_docx(md_text: str, output_path: Path, title: str,
+                  blocks: list = None):
+    """Markdown -> DOCX через python-docx.
+
+    blocks - результат parse_md_blocks(md_text), если он уже есть.
+    """
     from docx import Document as DocxDocument
     from docx.shared import Pt, Inches, RGBColor
 
@@ -1715,18 +2358,10 @@ def generate_docx(md_text: str, output_path: Path, title: str):
     style.font.size = Pt(11)
     style.paragraph_format.space_after = Pt(6)
 
-    lines = md_text.split('\n')
-    in_code = False
-    code_buf = []
-    table_buf = []
-
-    def flush_table():
-        nonlocal table_buf
-        if not table_buf:
-            return
+    def add_table(table_lines: list[str]):
         rows_data = []
-        for row_line in table_buf:
-            if re.match(r'^\|[\s\-:|]+\|$', row_line.strip()):
+        for row_line in table_lines:
+            if _TABLE_SEP_RE.match(row_line.strip()):
                 continue
             cells = [c.strip() for c in row_line.strip().split('|')[1:-1]]
             if cells:
@@ -1736,56 +2371,40 @@ def generate_docx(md_text: str, output_path: Path, title: str):
             n_cols = max(len(r) for r in rows_data)
             table = doc.add_table(rows=len(rows_data), cols=n_cols)
             table.style = 'Table Grid'
-            for i, row_data in enumerate(rows_data):
-                for j, cell_text in enumerate(row_data):
-                    if j < n_cols:
-                        table.rows[i].cells[j].text = clean_md(cell_text)
-            if rows_data:
-                for cell in table.rows[0].cells:
-                    for paragraph in cell.paragraphs:
-                        for run in paragraph.runs:
-                            run.font.bold = True
-        table_buf = []
-
-    def clean_md(text):
-        text = re.sub(r'\*\*\*(.+?)\*\*\*', r'\1', text)
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        text = re.sub(r'`(.+?)`', r'\1', text)
-        text = re.sub(r'\[(.+?)\]\(.+?\)', r'\1', text)
-        text = re.sub(r'!\[(.+?)\]\(.+?\)', r'[\1]', text)
-        return text
-
-    for line in lines:
-        if line.strip().startswith('```'):
-            if in_code:
-                flush_table()
-                code_text = '\n'.join(code_buf)
-                p = doc.add_paragraph()
-                run = p.add_run(code_text)
-                run.font.name = 'Courier New'
-                run.font.size = Pt(9)
-                run.font.color.rgb = RGBColor(0x20, 0x20, 0x30)
-                p.paragraph_format.left_indent = Inches(0.3)
-                code_buf = []
-                in_code = False
-            else:
-                flush_table()
-                in_code = True
+            # row.cells заново обходит XML строки при каждом обращении -
+            # ячейки берутся один раз на строку, заголовок выделяется в том же проходе
+            for i, (row, row_data) in enumerate(zip(table.rows, rows_data)):
+                cells = row.cells
+                for cell, cell_text in zip(cells, row_data):
+                    cell.text = clean_md(cell_text)
+                    if i == 0:
+                        for paragraph in cell.paragraphs:
+                            for run in paragraph.runs:
+                                run.font.bold = True
+
+    clean_md = strip_inline_markdown
+
+    if blocks is None:
+        blocks = parse_md_blocks(md_text)
+
+    for kind, block in blocks:
+        if kind == "code":
+            code_text = '\n'.join(block)
+            p = doc.add_paragraph()
+            run = p.add_run(code_text)
+            run.font.name = 'Courier New'
+            run.font.size = Pt(9)
+            run.font.color.rgb = RGBColor(0x20, 0x20, 0x30)
+            p.paragraph_format.left_indent = Inches(0.3)
             continue
 
-        if in_code:
-            code_buf.append(line)
+        if kind == "table":
+            add_table(block)
             continue
 
+        line = block
         stripped = line.strip()
 
-        if stripped.startswith('|') and stripped.endswith('|'):
-            table_buf.append(line)
-            continue
-        else:
-            flush_table()
-
         if not stripped:
             continue
 
@@ -1801,12 +2420,12 @@ def generate_docx(md_text: str, output_path: Path, title: str):
             p.paragraph_format.space_after = Pt(12)
             continue
 
-        list_m = re.match(r'^(\s*)([-*+])\s+(.+)', line)
+        list_m = _BULLET_ITEM_RE.match(line)
         if list_m:
             doc.add_paragraph(clean_md(list_m.group(3)), style='List Bullet')
             continue
 
-        num_m = re.match(r'^(\s*)\d+\.\s+(.+)', line)
+        num_m = _NUMBERED_ITEM_RE.match(line)
         if num_m:
             doc.add_paragraph(clean_md(num_m.group(2)), style='List Number')
             continue
@@ -1822,7 +2441,6 @@ def generate_docx(md_text: str, output_path: Path, title: str):
 
         doc.add_paragraph(clean_md(stripped))
 
-    flush_table()
     doc.save(str(output_path))
 
 
@@ -1952,8 +2570,7 @@ def _save_gdocs_folder(name: str, folder_id: str):
         if f["id"] == folder_id:
             return
     saved.append({"name": name, "id": folder_id})
-    _config["gdocs_saved_folders"] = saved
-    save_config(_config)
+    update_config(gdocs_saved_folders=saved)
 
 
 def ask_gdocs_folder(service) -> str | None:
@@ -2114,6 +2731,24 @@ def upload_to_gdocs(docx_path: Path, title: str, folder_id: str = None) -> str:
     return url
 
 
+def _prewarm_output_imports(formats: list[str]):
+    """Импортировать библиотеки генераторов заранее (в фоне, пока идет перевод).
+
+    Генераторы импортируют их лениво при первом вызове; здесь это делается
+    параллельно с запросами к API, и к шагу 4 модули уже в sys.modules.
+    Ошибки игнорируются - их покажет сам генератор.
+    """
+    try:
+        if "html" in formats:
+            import markdown  # noqa: F401
+        if "pdf" in formats:
+            import fpdf  # noqa: F401
+        if "docx" in formats:
+            import docx  # noqa: F401
+    except Exception:
+        pass
+
+
 def generate_outputs(md_text: str, output_dir: Path, base_name: str,
                      title: str, formats: list[str],
                      lang_pair: str = "en-ru") -> dict:
@@ -2121,42 +2756,36 @@ def generate_outputs(md_text: str, output_dir: Path, base_name: str,
     results = {"files": [], "errors": []}
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    if "md" in formats:
-        try:
-            path = output_dir / f"{base_name}.md"
-            path.write_text(md_text, encoding="utf-8")
-            results["files"].append(("MD", path))
-            log(f"  MD:   {path.name}", "OK")
-        except Exception as e:
-            results["errors"].append(f"MD: {e}")
+    def write_md(path: Path):
+        path.write_text(md_text, encoding="utf-8")
 
-    if "html" in formats:
-        try:
-            path = output_dir / f"{base_name}.html"
-            html = generate_html(md_text, title, lang_pair)
-            path.write_text(html, encoding="utf-8")
-            results["files"].append(("HTML", path))
-            log(f"  HTML: {path.name}", "OK")
-        except Exception as e:
-            results["errors"].append(f"HTML: {e}")
+    def write_html(path: Path):
+        path.write_text(generate_html(md_text, title, lang_pair), encoding="utf-8")
 
-    if "pdf" in formats:
-        try:
-            path = output_dir / f"{base_name}.pdf"
-            generate_pdf(md_text, path, title)
-            results["files"].append(("PDF", path))
-            log(f"  PDF:  {path.name}", "OK")
-        except Exception as e:
-            results["errors"].append(f"PDF: {e}")
+    # Разбивка на блоки общая для PDF и DOCX
+    blocks = parse_md_blocks(md_text) if ("pdf" in formats or "docx" in formats) else None
 
-    if "docx" in formats:
-        try:
-            path = output_dir / f"{base_name}.docx"
-            generate_docx(md_text, path, title)
-            results["files"].append(("DOCX", path))
-            log(f"  DOCX: {path.name}", "OK")
-        except Exception as e:
-            results["errors"].append(f"DOCX: {e}")
+    builders = {
+        "md": ("MD", ".md", write_md),
+        "html": ("HTML", ".html", write_html),
+        "pdf": ("PDF", ".pdf", lambda path: generate_pdf(md_text, path, title, blocks)),
+        "docx": ("DOCX", ".docx", lambda path: generate_docx(md_text, path, title, blocks)),
+    }
+    tasks = [(label, output_dir / f"{base_name}{ext}", build)
+             for fmt, (label, ext, build) in builders.items() if fmt in formats]
+
+    # Форматы независимы друг от друга - генерируются параллельно, а
+    # результаты и лог собираются в исходном порядке MD, HTML, PDF, DOCX
+    with ThreadPoolExecutor(max_workers=max(1, len(tasks))) as pool:
+        futures = [(label, path, pool.submit(build, path)) for label, path, build in tasks]
+        for label, path, fut in futures:
+            try:
+                fut.result()
+            except Exception as e:
+                results["errors"].append(f"{label}: {e}")
+                continue
+            results["files"].append((label, path))
+            log(f"  {label + ':':<6}{path.name}", "OK")
 
     return results
 
@@ -2168,35 +2797,42 @@ def generate_outputs(md_text: str, output_dir: Path, base_name: str,
 def find_input_candidates() -> list[tuple[Path, int, str]]:
     """Найти файлы с поддерживаемыми форматами."""
     candidates = []
-    skip = {'.git', '__pycache__', 'fonts', 'output', 'node_modules', '.venv', 'venv'}
+    # (st_dev, st_ino) уже найденных файлов: ROOT и cwd могут пересекаться
+    seen = set()
 
-    def scan(base: Path, depth: int = 0):
+    def scan(base: str, depth: int = 0):
         if depth > 2:
             return
+        # scandir отдает тип и stat из DirEntry (кэшируются) - без отдельного
+        # системного вызова на каждую проверку, как у Path.is_file()/stat()
         try:
-            for p in sorted(base.iterdir()):
-                if p.name.startswith('.') or p.name in skip:
-                    continue
-                if p.is_file() and p.suffix.lower() in INPUT_EXTENSIONS:
-                    candidates.append((p, p.stat().st_size, p.suffix.lower()))
-                elif p.is_dir():
-                    scan(p, depth + 1)
+            with os.scandir(base) as it:
+                entries = sorted(it, key=lambda e: e.name)
         except PermissionError:
-            pass
+            return
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.') or name in SCAN_SKIP_DIRS:
+                continue
+            try:
+                ext = os.path.splitext(name)[1].lower()
+                if ext in INPUT_EXTENSIONS and entry.is_file():
+                    st = entry.stat()
+                    key = (st.st_dev, st.st_ino)
+                    if key not in seen:
+                        seen.add(key)
+                        candidates.append((Path(entry.path), st.st_size, ext))
+                elif entry.is_dir():
+                    scan(entry.path, depth + 1)
+            except PermissionError:
+                continue
 
-    scan(ROOT)
+    scan(str(ROOT))
     cwd = Path.cwd()
     if cwd.resolve() != ROOT.resolve():
-        scan(cwd)
+        scan(str(cwd))
 
-    seen = set()
-    unique = []
-    for item in candidates:
-        resolved = item[0].resolve()
-        if resolved not in seen:
-            seen.add(resolved)
-            unique.append(item)
-    return unique
+    return candidates
 
 
 def interactive_menu() -> dict:
@@ -2235,6 +2871,7 @@ def interactive_menu() -> dict:
                 set_ui_lang("en" if _ui_lang == "ru" else "ru")
                 console.print(f"  [green]{'English' if _ui_lang == 'en' else 'Русский'}[/]")
 
+        from rich.panel import Panel
         console.print()
         console.print(Panel(
             f"[bold cyan]md-translate-ru[/] - {t('app_title')}\n"
@@ -2329,8 +2966,7 @@ def interactive_menu() -> dict:
             if lang_choice in LANGUAGES:
                 result["lang_pair"] = lang_choice
 
-        _config["last_lang_pair"] = result["lang_pair"]
-        save_config(_config)
+        update_config(last_lang_pair=result["lang_pair"])
 
         _, _, from_en, to_en = LANGUAGES[result["lang_pair"]]
         console.print(f"  [green]{from_en} -> {to_en}[/]")
@@ -2408,8 +3044,7 @@ def interactive_menu() -> dict:
         default_out = str(result["output_dir"])
         out_str = Prompt.ask(t("output_dir"), default=default_out)
         result["output_dir"] = Path(out_str).resolve()
-        _config["last_output_dir"] = str(result["output_dir"])
-        save_config(_config)
+        update_config(last_output_dir=str(result["output_dir"]))
 
     else:
         # === Fallback без Rich ===
@@ -2450,8 +3085,7 @@ def interactive_menu() -> dict:
 
         print(f"\n{t('step_lang')}:")
         print("  1=EN->RU 2=RU->EN 3=EN->DE 4=EN->ES 5=EN->FR")
-        lang_map = {"1": "en-ru", "2": "ru-en", "3": "en-de", "4": "en-es", "5": "en-fr"}
-        result["lang_pair"] = lang_map.get(input(f"{t('choice')} [1]: ").strip() or "1", "en-ru")
+        result["lang_pair"] = _MENU_LANG_MAP.get(input(f"{t('choice')} [1]: ").strip() or "1", "en-ru")
 
         print(f"\n{t('step_mode')}:")
         print(f"  1={t('mode_sync')} 2={t('mode_dry')}")
@@ -2468,11 +3102,8 @@ def interactive_menu() -> dict:
         gdocs_ok, gdocs_msg = check_gdocs_ready()
         if gdocs_ok:
             print(f"  6={t('fmt_all_gdocs')} 7={t('fmt_gdocs_only')}")
-        fmt_map = {"1": ["md","html","pdf","docx"], "2": ["pdf","docx"],
-                   "3": ["pdf"], "4": ["docx"], "5": ["md"],
-                   "6": ["md","html","pdf","docx","gdocs"], "7": ["docx","gdocs"]}
-        chosen = fmt_map.get(input(f"{t('choice')} [1]: ").strip() or "1",
-                             ["md","html","pdf","docx"])
+        chosen = list(_MENU_FMT_MAP.get(input(f"{t('choice')} [1]: ").strip() or "1",
+                                        _ALL_FORMATS))
         if "gdocs" in chosen and not gdocs_ok:
             print(f"  {gdocs_msg}")
             chosen = [f for f in chosen if f != "gdocs"]
@@ -2495,25 +3126,40 @@ def interactive_menu() -> dict:
 # ---------------------------------------------------------------------------
 
 def show_forecast(input_files: list[Path], texts: list[str], system_tokens: int,
-                  budget: float = None) -> list[dict]:
-    """Показать прогноз стоимости."""
+                  budget: float = None, lang_pair: str = "en-ru",
+                  chunk_counts: list[int] = None) -> list[dict]:
+    """Показать прогноз стоимости.
+
+    Вход оценивается по языку исходника, выход - по языку перевода (перевод
+    примерно той же длины в символах, +15% запаса). Системный промпт
+    уходит с каждым чанком. chunk_counts - число чанков каждого текста,
+    если тексты уже разбиты.
+    """
+    source_lang, _, target_lang = lang_pair.partition("-")
+    # Коэффициенты языков выбираются один раз; итоги копятся в том же проходе
+    source_cpt = CHARS_PER_TOKEN.get(source_lang, DEFAULT_CHARS_PER_TOKEN)
+    target_cpt = CHARS_PER_TOKEN.get(target_lang, DEFAULT_CHARS_PER_TOKEN)
     forecasts = []
-    for f, text in zip(input_files, texts):
-        chunks = split_into_chunks(text)
-        est_input = estimate_tokens(text) + system_tokens
-        est_output = int(estimate_tokens(text) * 1.15)
+    total_cost = total_time = 0.0
+    total_chars = 0
+    for idx, (f, text) in enumerate(zip(input_files, texts)):
+        chars = len(text)
+        n_chunks = chunk_counts[idx] if chunk_counts else len(split_into_chunks(text))
+        est_input = int(chars / source_cpt) + system_tokens * n_chunks
+        est_output = int(int(chars / target_cpt) * 1.15)
         est_cost = calc_cost(est_input, est_output)
-        est_time = len(text) / 1000 * AVG_SECONDS_PER_1K_CHARS
+        est_time = chars / 1000 * AVG_SECONDS_PER_1K_CHARS
         forecasts.append({
-            "name": f.name, "chars": len(text), "chunks": len(chunks),
+            "name": f.name, "chars": chars, "chunks": n_chunks,
             "est_cost": est_cost, "est_time": est_time,
         })
-
-    total_cost = sum(fc["est_cost"] for fc in forecasts)
-    total_time = sum(fc["est_time"] for fc in forecasts)
-    total_chars = sum(fc["chars"] for fc in forecasts)
+        total_cost += est_cost
+        total_time += est_time
+        total_chars += chars
 
     if HAS_RICH:
+        from rich import box
+        from rich.table import Table
         table = Table(title=t("forecast_title"), box=box.ROUNDED, show_lines=True, title_style="bold cyan")
         table.add_column("#", style="dim", width=4, justify="right")
         table.add_column(t("file_col"), style="bold white", max_width=30)
@@ -2544,11 +3190,16 @@ def show_forecast(input_files: list[Path], texts: list[str], system_tokens: int,
         console.print(table)
         console.print()
     else:
-        print(f"\n{t('forecast_title').upper()}: {len(forecasts)} {t('files_label')}, {total_chars:,} {t('chars')}")
-        print(f"{t('time_col')}: {format_duration(total_time)}, {t('price_col')}: ${total_cost:.2f}")
+        # Без rich прогноз собирается целиком и выводится одной записью
+        lines = [
+            "",
+            f"{t('forecast_title').upper()}: {len(forecasts)} {t('files_label')}, {total_chars:,} {t('chars')}",
+            f"{t('time_col')}: {format_duration(total_time)}, {t('price_col')}: ${total_cost:.2f}",
+        ]
         if budget is not None:
-            print(f"Budget: ${budget:.2f}")
-        print()
+            lines.append(f"Budget: ${budget:.2f}")
+        lines.append("\n")
+        sys.stdout.write("\n".join(lines))
 
     return forecasts
 
@@ -2572,6 +3223,10 @@ def main():
     parser.add_argument("--model", default=None, help="Claude model")
     parser.add_argument("--no-interactive", action="store_true", help="No interactive menu")
     parser.add_argument("--ui-lang", default=None, choices=["ru", "en"], help="Interface language")
+    parser.add_argument("--max-parallel", type=int, default=DEFAULT_MAX_PARALLEL,
+                        help=f"Concurrent API requests (default: {DEFAULT_MAX_PARALLEL}, 1 = sequential)")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM,
+                        help=f"API requests per minute limit (default: {DEFAULT_RPM}, 0 = no limit)")
     args = parser.parse_args()
 
     # === Проверка зависимостей (после --help) ===
@@ -2598,13 +3253,7 @@ def main():
         if not input_files:
             sys.exit(1)
 
-        fmt_map = {
-            "all": ["md", "html", "pdf", "docx"],
-            "pdf": ["pdf"], "docx": ["docx"], "html": ["html"], "md": ["md"],
-            "gdocs": ["docx", "gdocs"],
-            "all+gdocs": ["md", "html", "pdf", "docx", "gdocs"],
-        }
-        formats = fmt_map.get(args.format or "all", ["md", "html", "pdf", "docx"])
+        formats = list(_FMT_MAP.get(args.format or "all", _ALL_FORMATS))
 
         # Validate gdocs availability
         if "gdocs" in formats:
@@ -2631,7 +3280,8 @@ def main():
 
     input_files = config["input_files"]
     lang_pair = config["lang_pair"]
-    _, _, from_en, to_en = LANGUAGES.get(lang_pair, LANGUAGES["en-ru"])
+    lang_tuple = LANGUAGES.get(lang_pair, LANGUAGES["en-ru"])
+    _, _, from_en, to_en = lang_tuple
 
     # ========================
     # PIPELINE START
@@ -2644,33 +3294,51 @@ def main():
     # ----- STEP 1 -----
     log(t("step_reading"), "STEP")
 
+    # Текстовые и DOCX-файлы читаются в пуле потоков; их сообщения копятся
+    # и выводятся вместе с заголовком файла по порядку, по мере готовности.
+    # PDF читаются здесь же, в основном потоке, когда чтение остальных
+    # файлов закончено: большие PDF разбираются собственным пулом процессов,
+    # и он должен работать один (без конкуренции за CPU и без fork посреди
+    # работающих потоков).
+    # Объем и картинки считаются в том же проходе по прочитанным текстам.
+    # Поиск картинок - чистый regex под GIL, потоки его не ускорят; тексты
+    # без "![" отсекаются в detect_images без прохода регулярным выражением
     source_texts = []
-    for f in input_files:
-        log(f"  {f.name} ({f.suffix.lower()})...")
-        text, fmt = read_input_file(f)
-        if text.strip():
+    total_chars = 0
+    total_images = 0
+    files_with_images = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(input_files)))) as pool:
+        read_futures = [None if f.suffix.lower() == ".pdf"
+                        else pool.submit(read_input_file_buffered, f)
+                        for f in input_files]
+        for f, fut in zip(input_files, read_futures):
+            log(f"  {f.name} ({f.suffix.lower()})...")
+            if fut is None:
+                wait([other for other in read_futures if other is not None])
+                text, fmt = read_input_file(f)
+            else:
+                text, fmt, messages = fut.result()
+                for msg, level in messages:
+                    log(msg, level)
+            if not text.strip():
+                log(f"    {t('empty_file')}", "WARN")
+                continue
             source_texts.append(text)
+            total_chars += len(text)
+            imgs = detect_images(text)
+            if imgs:
+                total_images += len(imgs)
+                files_with_images += 1
             log(f"    {len(text):,} {t('chars')}", "OK")
-        else:
-            log(f"    {t('empty_file')}", "WARN")
 
     if not source_texts:
         log(t("no_text"), "ERROR")
         return
 
-    total_chars = sum(len(tx) for tx in source_texts)
     log(f"  {t('total')}: {len(source_texts)} {t('files_label')}, {total_chars:,} {t('chars')}")
 
     # ----- IMAGE DETECTION -----
     translate_alt_text = False
-    total_images = 0
-    files_with_images = 0
-    for txt in source_texts:
-        imgs = detect_images(txt)
-        if imgs:
-            total_images += len(imgs)
-            files_with_images += 1
-
     if total_images > 0:
         log(f"  {t('images_found')}: {t('images_count', n=total_images, f=files_with_images)}")
         if sys.stdin.isatty():
@@ -2690,14 +3358,24 @@ def main():
     log(t("step_forecast"), "STEP")
 
     glossary = load_json(GLOSSARY_PATH)
-    system_prompt = build_system_prompt(lang_pair, glossary)
+    glossary_pairs = glossary_term_pairs(glossary)
+    # Пары терминов уже собраны - промпт строится по ним, без повторного сбора
+    system_prompt = build_system_prompt(lang_tuple, glossary, glossary_pairs)
+    # Для других пар английские термины и русские основы не совпадут с
+    # текстами - проверка дала бы только ложные предупреждения
+    check_glossary = bool(glossary_pairs) and lang_pair == GLOSSARY_LANG_PAIR
 
-    system_tokens = estimate_tokens(system_prompt)
+    # Системный промпт написан по-русски
+    system_tokens = estimate_tokens(system_prompt, "ru")
 
     if glossary:
         log(f"  {t('glossary_terms', n=len(glossary))}")
 
-    forecasts = show_forecast(input_files, source_texts, system_tokens, config["budget"])
+    # Каждый текст разбивается на чанки один раз: число чанков нужно
+    # прогнозу, сами чанки - переводу
+    source_chunks = [split_into_chunks(tx) for tx in source_texts]
+    forecasts = show_forecast(input_files, source_texts, system_tokens, config["budget"], lang_pair,
+                              chunk_counts=[len(c) for c in source_chunks])
 
     if config["dry_run"]:
         ui_print(f"[dim]{t('dry_run_note')}[/]" if HAS_RICH else t("dry_run_note"))
@@ -2719,6 +3397,9 @@ def main():
     # ----- STEP 3 -----
     log(t("step_translate"), "STEP")
 
+    threading.Thread(target=_prewarm_output_imports, args=(config["formats"],),
+                     daemon=True).start()
+
     model = config.get("model") or os.getenv("TRANSLATE_MODEL", DEFAULT_MODEL)
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
@@ -2727,46 +3408,86 @@ def main():
         sys.exit(1)
 
     import anthropic
-    client = anthropic.Anthropic(api_key=api_key)
+    client = anthropic.Anthropic(api_key=api_key, max_retries=API_MAX_RETRIES)
     log(f"  {t('model_label')}: {model}")
     log(f"  {t('direction')}: {from_en} -> {to_en}")
 
-    translations = []
-    total_stats = {"input_tokens": 0, "output_tokens": 0, "cost": 0.0, "errors": 0}
-    spent = 0.0
+    max_parallel = max(1, args.max_parallel)
+    throttle = RequestThrottle(args.rpm)
+
+    results = {}
+    total_stats = {"input_tokens": 0, "output_tokens": 0, "errors": 0}
+    spent = 0.0  # фактическая стоимость переведенных файлов (по usage ответов)
     start_time = time.time()
 
-    for i, (f, text) in enumerate(zip(input_files, source_texts), 1):
-        if _interrupted:
-            log(t("stopped_by_user"), "WARN")
-            break
+    # Файлы переводятся параллельно (file_pool), а все запросы к API - в том
+    # числе чанки одного файла - идут через api_pool из max_parallel потоков.
+    # Бюджет проверяется перед запуском файла: потрачено + оценка файлов в работе.
+    jobs = list(enumerate(zip(input_files, source_texts), 1))
+    next_job = 0
+    in_flight = {}
+    reserved = 0.0
+    stop = False
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as api_pool, \
+            ThreadPoolExecutor(max_workers=max_parallel) as file_pool:
+        while in_flight or (not stop and next_job < len(jobs)):
+            while not stop and next_job < len(jobs) and len(in_flight) < max_parallel:
+                i, (f, text) = jobs[next_job]
+                if _interrupted:
+                    log(t("stopped_by_user"), "WARN")
+                    stop = True
+                    break
+
+                est_cost = forecasts[i - 1]["est_cost"]
+                if config["budget"] is not None and spent + reserved + est_cost > config["budget"]:
+                    log(t("budget_exhausted", spent=spent, budget=config["budget"]), "WARN")
+                    stop = True
+                    break
+
+                if HAS_RICH:
+                    console.print(Rule(f"[bold]{f.name}[/]", style="cyan"))
+                log(f"  [{i}/{len(input_files)}] {f.name} ({len(text):,} {t('chars')})...")
+
+                fut = file_pool.submit(
+                    translate_document, client, model, system_prompt, text, f.name, lang_pair,
+                    translate_images=translate_alt_text, executor=api_pool, throttle=throttle,
+                    chunks=source_chunks[i - 1],
+                )
+                # Дальше чанки нужны только translate_document - освобождаются вместе с ним
+                source_chunks[i - 1] = None
+                in_flight[fut] = (i, est_cost)
+                reserved += est_cost
+                next_job += 1
 
-        if config["budget"] is not None:
-            fc = forecasts[i - 1]
-            if spent + fc["est_cost"] > config["budget"]:
-                log(t("budget_exhausted", spent=spent, budget=config["budget"]), "WARN")
+            if not in_flight:
                 break
 
-        if HAS_RICH:
-            console.print(Rule(f"[bold]{f.name}[/]", style="cyan"))
-
-        log(f"  [{i}/{len(input_files)}] {f.name} ({len(text):,} {t('chars')})...")
-
-        stats = translate_document(client, model, system_prompt, text, f.name, lang_pair,
-                                   translate_images=translate_alt_text)
-
-        if stats["translated_text"]:
-            translations.append(stats)
-            total_stats["input_tokens"] += stats["input_tokens"]
-            total_stats["output_tokens"] += stats["output_tokens"]
-            spent += stats["cost"]
-            log(f"    {stats['input_tokens']:,} in + {stats['output_tokens']:,} out = ${stats['cost']:.2f}", "OK")
-        else:
-            total_stats["errors"] += 1
-            log(f"    {t('error_label')}: {stats['status']}", "ERROR")
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, est_cost = in_flight.pop(fut)
+                reserved -= est_cost
+                stats = fut.result()
+                results[i] = stats
+
+                if stats.translated_text:
+                    total_stats["input_tokens"] += stats.input_tokens
+                    total_stats["output_tokens"] += stats.output_tokens
+                    spent += stats.cost
+                    log(f"    {stats.file}: {stats.input_tokens:,} in + "
+                        f"{stats.output_tokens:,} out = ${stats.cost:.2f}", "OK")
+                    missing = find_missing_glossary_terms(
+                        jobs[i - 1][1][1], stats.translated_text,
+                        glossary_pairs) if check_glossary else []
+                    if missing:
+                        shown = ", ".join(missing[:10]) + (", ..." if len(missing) > 10 else "")
+                        log(f"    {stats.file}: {t('glossary_missing', n=len(missing), terms=shown)}", "WARN")
+                else:
+                    total_stats["errors"] += 1
+                    log(f"    {stats.file}: {t('error_label')}: {stats.status}", "ERROR")
 
-        if i < len(input_files):
-            time.sleep(2)
+    # Порядок файлов в итоговом документе - как на входе
+    translations = [results[i] for i in sorted(results) if results[i].translated_text]
 
     if not translations:
         log(t("no_translated"), "ERROR")
@@ -2777,19 +3498,19 @@ def main():
     # ----- MARKDOWN REPAIR -----
     source_by_name = {f.name: txt for f, txt in zip(input_files, source_texts)}
     for stats in translations:
-        src = source_by_name.get(stats["file"], "")
-        if src and stats["translated_text"]:
-            repaired = repair_markdown(src, stats["translated_text"])
-            if repaired != stats["translated_text"]:
-                stats["translated_text"] = repaired
-                log(f"  {stats['file']}: markdown-разметка восстановлена", "OK")
+        src = source_by_name.get(stats.file, "")
+        if src and stats.translated_text:
+            repaired = repair_markdown(src, stats.translated_text)
+            if repaired != stats.translated_text:
+                stats.translated_text = repaired
+                log(f"  {stats.file}: markdown-разметка восстановлена", "OK")
 
     # ----- MARKDOWN VALIDATION -----
     all_warnings = []
     for stats in translations:
-        src = source_by_name.get(stats["file"], "")
-        if src and stats["translated_text"]:
-            w = validate_markdown(src, stats["translated_text"], stats["file"])
+        src = source_by_name.get(stats.file, "")
+        if src and stats.translated_text:
+            w = validate_markdown(src, stats.translated_text, stats.file)
             all_warnings.extend(w)
 
     if all_warnings:
@@ -2805,11 +3526,12 @@ def main():
     output_dir = config["output_dir"]
     base_name = config["output_name"]
 
-    title_match = re.search(r'^#\s+(.+)', assembled_md, re.MULTILINE)
+    title_match = _TITLE_RE.search(assembled_md)
     title = title_match.group(1).strip() if title_match else base_name
 
     if "pdf" in config["formats"]:
-        if not (FONT_DIR / "DejaVuSans.ttf").exists():
+        # Тот же (кэшированный) поиск шрифтов, что и в generate_pdf
+        if not any(family == "DejaVuSans" and style == "" for family, style, _ in _pdf_fonts()):
             log(t("fonts_missing"), "WARN")
             config["formats"] = [f for f in config["formats"] if f != "pdf"]
 
@@ -2840,20 +3562,23 @@ def main():
     # ========================
     # RESULTS
     # ========================
-    total_cost_actual = calc_cost(total_stats["input_tokens"], total_stats["output_tokens"])
+    total_cost_actual = spent
 
     if HAS_RICH:
         console.print()
         console.print(Rule(f"[bold green]{t('done_title')}[/]", style="green"))
         console.print()
 
+        from rich import box
+        from rich.panel import Panel
+        from rich.table import Table
         summary = Table(box=box.SIMPLE, show_header=False, padding=(0, 2))
         summary.add_column("Key", style="dim")
         summary.add_column("Value", style="bold")
 
         summary.add_row(t("files_translated"), f"{len(translations)} / {len(input_files)}")
         summary.add_row(t("direction"), f"{from_en} -> {to_en}")
-        summary.add_row(t("chars_processed"), f"{sum(tx['source_chars'] for tx in translations):,}")
+        summary.add_row(t("chars_processed"), f"{sum(tx.source_chars for tx in translations):,}")
         summary.add_row(t("tokens_label"), f"{total_stats['input_tokens']:,} in + {total_stats['output_tokens']:,} out")
         summary.add_row(t("cost_label"), f"${total_cost_actual:.2f}")
         summary.add_row(t("time_label"), format_duration(elapsed))